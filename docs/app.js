@@ -250,7 +250,7 @@ el('toStep5').addEventListener('click', async ()=>{
       boundaryGeoJSON = await readJSON(boundaryFileInput.files[0]);
     } else {
       const picked = document.querySelector('input[name="prov"]:checked').value;
-      const resp = await fetch(picked, { cache: 'no-store' });
+      const resp = await fetch(picked, { cache: 'no-cache' });
       boundaryGeoJSON = await resp.json();
     }
     el('progress').textContent = 'Joining…';
@@ -52,7 +52,7 @@ el('go').addEventListener('click', async ()=>{
     if (!url) { msg.textContent='Browser-only mode: this State/Area is not yet hosted. Use the Local App (one click) or pick another area.'; return; }
     try {
       msg.textContent = 'Loading boundary…';
-      const resp = await fetch(url, { cache: 'no-store' });
+      const resp = await fetch(url, { cache: 'no-cache' });
       const gj = await resp.json();
       msg.textContent = 'Processing CSV…';
       const text = await el('csv').files[0].text();
@@ -83,9 +83,12 @@ el('go').addEventListener('click', async ()=>{
     const tol = parseFloat(document.getElementById('simplifyTol').value || '0');
     if (simpOn && tol > 0) fd.append('simplify', String(tol));
     fd.append('csv', f);
-    const r = await fetch(localAPI.base+'/join', { method:'POST', body:fd });
-    if (!r.ok) throw new Error('Join failed');
-    result = await r.json();
+    result = await joinAttributes(st, level, fd, simpOn && tol > 0 ? tol : 0);
+    if (!result) {
+      const r = await fetch(localAPI.base+'/join', { method:'POST', body:fd });
+      if (!r.ok) throw new Error('Join failed');
+      result = await r.json();
+    }
     msg.textContent = 'Map ready.';
     el('after').style.display='block';
     // Enable preview button unless too large
@@ -111,6 +114,33 @@ el('go').addEventListener('click', async ()=>{
   }
 });
 
+// Boundary geometry (HTTP-cached, revalidated with its ETag) + attribute-only join,
+// merged here: re-joining a CSV only moves the attribute table. Null on any failure.
+async function joinAttributes(st, level, fd, simplifyDeg){
+  try {
+    const q = new URLSearchParams({ level, state: st });
+    // Same meaning as `simplify` on /join: a matching LOD, else simplified on the server
+    if (simplifyDeg > 0) q.set('simplify', String(simplifyDeg));
+    const afd = new FormData();
+    for (const [k, v] of fd.entries()) afd.append(k, v);
+    afd.append('attributes', 'true');
+    const [gr, ar] = await Promise.all([
+      fetch(localAPI.base+'/boundaries?'+q, { cache: 'no-cache' }),
+      fetch(localAPI.base+'/join', { method:'POST', body:afd })
+    ]);
+    if (!gr.ok || !ar.ok) return null;
+    const [gj, table] = await Promise.all([gr.json(), ar.json()]);
+    const cols = Object.keys(table.columns), keys = table.columns[table.key], rows = new Map();
+    // First row per key wins, as in the server's join
+    keys.forEach((k, i)=> { if (!rows.has(String(k))) rows.set(String(k), i); });
+    for (const feat of gj.features) {
+      const i = rows.get(String(feat.properties[table.key]));
+      for (const c of cols) if (c !== table.key) feat.properties[c] = i === undefined ? null : table.columns[c][i];
+    }
+    return gj;
+  } catch { return null; }
+}
+
 el('download').addEventListener('click', ()=>{
   if (!result) return;
   const name = `${el('state').value}_${el('level').value}_joined.geojson`;
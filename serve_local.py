@@ -1,11 +1,19 @@
 #!/usr/bin/env python3
 """
 Simple HTTP server to run the choropleth tool locally without CORS issues.
+
+Boundary files under docs/boundaries* are sent with an ETag (answered with
+304 when unchanged) and compressed: a fresh sibling ``.br``/``.gz`` file is
+sent as-is, otherwise the file is gzipped once and kept in memory.
 """
 
+import email.utils
+import gzip
 import http.server
+import io
 import socketserver
 import os
+import threading
 import webbrowser
 from pathlib import Path
 
@@ -13,7 +21,76 @@ from pathlib import Path
 os.chdir(Path(__file__).parent / 'docs')
 
 PORT = 8000
-Handler = http.server.SimpleHTTPRequestHandler
+
+
+class BoundaryCachingHandler(http.server.SimpleHTTPRequestHandler):
+    _gzipped = {}
+    _lock = threading.Lock()
+
+    def is_boundary(self, path):
+        rel = os.path.relpath(path, os.getcwd())
+        return rel.startswith('boundaries') and os.path.isfile(path)
+
+    def accepts(self, encoding):
+        return encoding in [e.split(';')[0].strip() for e in self.headers.get('Accept-Encoding', '').split(',')]
+
+    def compressed_body(self, path, st):
+        # Precompressed sibling written next to the file (e.g. `gzip -k -9`), if not stale
+        for enc, ext in (('br', '.br'), ('gzip', '.gz')):
+            sibling = path + ext
+            if self.accepts(enc) and os.path.exists(sibling) and os.path.getmtime(sibling) >= st.st_mtime:
+                with open(sibling, 'rb') as f:
+                    return enc, f.read()
+        if not self.accepts('gzip'):
+            return None, None
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            body = self._gzipped.get(key)
+        if body is None:
+            with open(path, 'rb') as f:
+                body = gzip.compress(f.read(), compresslevel=9, mtime=0)
+            with self._lock:
+                self._gzipped = {k: v for k, v in self._gzipped.items() if k[0] != path}
+                self._gzipped[key] = body
+        return 'gzip', body
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not self.is_boundary(path):
+            return super().send_head()
+        st = os.stat(path)
+        etag = f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        if etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_cache_headers(etag)
+            self.end_headers()
+            return None
+        encoding, body = self.compressed_body(path, st)
+        if body is None:
+            with open(path, 'rb') as f:
+                body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Last-Modified', email.utils.formatdate(st.st_mtime, usegmt=True))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_cache_headers(etag)
+        self.end_headers()
+        # send_head's callers copy the returned file object into the response
+        return io.BytesIO(body)
+
+    def send_cache_headers(self, etag):
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+
+
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+Handler = BoundaryCachingHandler
 
 print(f"Starting local server on http://localhost:{PORT}")
 print("Opening browser...")
@@ -21,7 +98,7 @@ print("Opening browser...")
 # Open browser automatically
 webbrowser.open(f'http://localhost:{PORT}')
 
-with socketserver.TCPServer(("", PORT), Handler) as httpd:
+with Server(("", PORT), Handler) as httpd:
     print(f"\n✅ Server running at http://localhost:{PORT}")
     print("Press Ctrl+C to stop the server\n")
-    httpd.serve_forever()
\ No newline at end of file
+    httpd.serve_forever()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped Arrow IPC copies of the national boundary layers.
+
+convert_cache_to_parquet.py writes ``<parquet>/store/<layer>.arrow`` next to
+each partitioned layer: one uncompressed record batch with WKB geometry
+(``geoarrow.wkb``), rows grouped by STATEFP (Hilbert order kept within a
+state) and each state's ``[start, stop)`` row range in the schema metadata.
+
+Every engine process maps the same file read-only, so a national layer is
+held once in the OS page cache instead of once per worker heap. A state
+request slices its rows out of the mapped table without copying and decodes
+only those into shapely geometries.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except Exception:  # pragma: no cover
+    pa = None
+
+STORE_DIR_NAME = 'store'
+STORE_SUFFIX = '.arrow'
+STATE_RANGES_KEY = b'state_ranges'
+WKB_EXTENSION = b'geoarrow.wkb'
+
+
+def store_path(parquet_dir: str, base: str) -> str:
+    return os.path.join(parquet_dir, STORE_DIR_NAME, base + STORE_SUFFIX)
+
+
+def write_store(gdf, path: str, key: str = 'STATEFP') -> int:
+    """Write ``gdf`` grouped by ``key`` (rows without one go last); returns the number of states."""
+    keys = gdf[key].astype(object).where(gdf[key].notna(), None).to_numpy()
+    # '~' sorts after every FIPS code, so unassigned rows end up past the last range
+    order = np.argsort(np.array([k if k is not None else '~' for k in keys], dtype=object), kind='stable')
+    table = pa.table(gdf.iloc[order].to_arrow(geometry_encoding='WKB', index=False)).combine_chunks()
+    sorted_keys = keys[order]
+    ranges: Dict[str, Tuple[int, int]] = {}
+    for i, k in enumerate(sorted_keys):
+        if k is None:
+            break
+        start, _ = ranges.get(k, (i, i))
+        ranges[k] = (start, i + 1)
+    metadata = dict(table.schema.metadata or {})
+    metadata[STATE_RANGES_KEY] = json.dumps(ranges).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    tmp = path + '.tmp'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return len(ranges)
+
+
+class BoundaryStore:
+    """A store file mapped read-only: ``table`` is backed by the mapping, not the heap."""
+
+    # File-backed pages are shared by every process mapping the file and can be
+    # dropped by the OS; they are not charged to the boundary cache budget
+    nbytes = 0
+
+    def __init__(self, path: str):
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        meta = self.table.schema.metadata or {}
+        self.ranges = {k: tuple(v) for k, v in json.loads(meta.get(STATE_RANGES_KEY, b'{}')).items()}
+        self.geometry = next(
+            (f.name for f in self.table.schema if (f.metadata or {}).get(b'ARROW:extension:name') == WKB_EXTENSION),
+            'geometry',
+        )
+
+    @property
+    def num_rows(self) -> int:
+        return self.table.num_rows
+
+    def rows(self, state_fips: Optional[Iterable[str]] = None,
+             columns: Optional[Sequence[str]] = None) -> 'pa.Table':
+        # Zero-copy: column selection and slices are views of the mapped buffers
+        table = self.table
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.column_names and c != self.geometry] + [self.geometry])
+        if state_fips is None:
+            return table
+        parts = [table.slice(r[0], r[1] - r[0]) for r in (self.ranges.get(f) for f in state_fips) if r]
+        return pa.concat_tables(parts) if parts else table.slice(0, 0)
+
+    def read(self, state_fips: Optional[Iterable[str]] = None,
+             columns: Optional[Sequence[str]] = None) -> 'gpd.GeoDataFrame':
+        """Decode the rows of ``state_fips`` (all rows when None) into a GeoDataFrame."""
+        import geopandas as gpd
+
+        return gpd.GeoDataFrame.from_arrow(self.rows(state_fips, columns))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark the boundary/CSV join: string merge (the old path) vs integer-code index join.
+
+Uses the national block-group layers from the parquet cache when
+``--cache-dir`` has them, otherwise a synthetic layer of ``--features``
+boxes with 12-digit GEOIDs. The CSV side has the GEOID as an integer
+(leading zeros lost), as spreadsheets export it.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import geopandas as gpd
+import shapely
+
+from geoid import index_join, level_codes
+
+
+def synthetic_layer(n: int, seed: int = 0) -> 'gpd.GeoDataFrame':
+    rng = np.random.default_rng(seed)
+    state = rng.integers(1, 57, n)
+    rest = rng.choice(10 ** 10, n, replace=False)
+    geoid = pd.Series(state * 10 ** 10 + rest).astype(str).str.zfill(12)
+    x = rng.uniform(-125, -67, n)
+    y = rng.uniform(25, 49, n)
+    return gpd.GeoDataFrame(
+        {'GEOID': geoid, 'STATEFP': geoid.str[:2], 'NAME': 'Block Group ' + geoid.str[-1], 'ALAND': rng.integers(0, 10 ** 7, n)},
+        geometry=shapely.box(x, y, x + 0.01, y + 0.01), crs='EPSG:4269',
+    )
+
+
+def cached_layer(cache_dir: str) -> 'gpd.GeoDataFrame':
+    paths = sorted(glob.glob(os.path.join(cache_dir, 'parquet', 'cb_2023_*_bg_500k.parquet')))
+    if not paths:
+        return None
+    frames = [gpd.read_parquet(p) for p in paths]
+    return gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=frames[0].crs)
+
+
+def csv_for(gdf: 'gpd.GeoDataFrame', match: float, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    keys = gdf['GEOID'].sample(frac=match, random_state=seed).astype('int64').to_numpy()
+    n = len(keys)
+    hh = rng.integers(1, 2000, n)
+    return pd.DataFrame({
+        'GEOID': keys,
+        'Households': hh,
+        'Poverty Households': (hh * rng.uniform(0, 0.3, n)).astype(int),
+        'ALICE Households': (hh * rng.uniform(0, 0.4, n)).astype(int),
+        'County': 'Somewhere',
+    })
+
+
+def string_merge(gdf, df):
+    df = df.copy()
+    df['_J'] = df['GEOID'].astype(str).str.extract(r'(\d+)')[0].str.zfill(12).fillna('')
+    mg = gdf.assign(_J=gdf['GEOID'].astype(str)).merge(df, how='left', left_on='_J', right_on='_J')
+    return mg.drop(columns=['_J'])
+
+
+def code_join(gdf, df):
+    return index_join(gdf, df, level_codes('bg', gdf['GEOID'])[0], level_codes('bg', df['GEOID'])[0])
+
+
+def best_of(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Benchmark string merge vs integer index join on block groups')
+    p.add_argument('--cache-dir', default=os.environ.get('CHOROPLETH_CACHE_DIR'), help='TIGER cache with parquet/cb_2023_*_bg_500k.parquet')
+    p.add_argument('--features', type=int, default=240000, help='Synthetic layer size when no cached block groups (default 240000)')
+    p.add_argument('--match', type=float, default=0.9, help='Share of features present in the CSV (default 0.9)')
+    p.add_argument('--repeat', type=int, default=3, help='Runs per method; the best is reported (default 3)')
+    args = p.parse_args()
+
+    gdf = cached_layer(args.cache_dir) if args.cache_dir else None
+    source = 'cached block groups'
+    if gdf is None:
+        gdf = synthetic_layer(args.features)
+        source = 'synthetic'
+    df = csv_for(gdf, args.match)
+    print(f"{len(gdf)} features ({source}), {len(df)} CSV rows")
+
+    t_old, old = best_of(lambda: string_merge(gdf, df), args.repeat)
+    t_new, new = best_of(lambda: code_join(gdf, df), args.repeat)
+    same = np.array_equal(old['Households'].to_numpy(dtype=float), new['Households'].to_numpy(dtype=float), equal_nan=True)
+    print(f"string merge : {t_old * 1000:8.1f} ms")
+    print(f"index join   : {t_new * 1000:8.1f} ms  ({t_old / t_new:.1f}x, results {'match' if same else 'DIFFER'})")
+    return 0 if same else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Process-wide LRU cache for decoded boundary layers.
+
+Entries are keyed by the layer they were read from and carry a version
+(typically the source file mtime) so a refreshed TIGER cache is picked up
+without restarting the engine. Concurrent misses for the same entry are
+coalesced: one thread loads, the others wait for its result.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+try:
+    import shapely
+except Exception:  # pragma: no cover
+    shapely = None
+
+# Rough per-geometry overhead of a shapely object on top of its coordinates
+_GEOM_OVERHEAD = 112
+
+
+def estimate_nbytes(obj: Any) -> int:
+    """Approximate resident size of a (Geo)DataFrame, including geometry coordinates."""
+    if hasattr(obj, 'memory_usage'):
+        total = 0
+        for col, n in obj.memory_usage(deep=False, index=True).items():
+            dtype = getattr(obj[col], 'dtype', None) if col != 'Index' else None
+            if dtype is not None and str(dtype) == 'geometry':
+                geoms = obj[col].values
+                if shapely is not None:
+                    total += int(shapely.get_num_coordinates(geoms).sum()) * 16
+                total += len(geoms) * _GEOM_OVERHEAD
+            elif dtype is not None and dtype == object:
+                total += int(obj[col].memory_usage(deep=True, index=False))
+            else:
+                total += int(n)
+        return total
+    if hasattr(obj, 'nbytes'):
+        return int(obj.nbytes)
+    return 0
+
+
+class _Flight:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run ``fn`` once per key at a time; concurrent callers with the same key share the result."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = fn()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class BoundaryCache:
+    def __init__(self, budget_bytes: int, sizeof: Callable[[Any], int] = estimate_nbytes):
+        self.budget_bytes = int(budget_bytes)
+        self._sizeof = sizeof
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: Any, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            if size > self.budget_bytes:
+                # Larger than the whole budget: serve it, but do not keep it
+                return
+            self._entries[key] = (version, value, size)
+            self.bytes += size
+            while self.bytes > self.budget_bytes and self._entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, version: Any, loader: Callable[[], Any]) -> Any:
+        value = self.get(key, version)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        def load():
+            # Re-check: the previous flight for this key may have just stored it
+            cached = self.get(key, version)
+            if cached is not None:
+                return cached
+            with self._lock:
+                self.misses += 1
+            loaded = loader()
+            self.put(key, version, loaded)
+            return loaded
+
+        return self._flights.do((key, version), load)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self._flights.coalesced,
+            }
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Serializers for boundary layers sent by the local engine and written by the CLI.
+
+GeoJSON is produced feature by feature so a national layer never has to
+exist as one Python string (or be JSON-encoded a second time). The binary
+formats (Arrow IPC with GeoArrow geometry, FlatGeobuf) are several times
+smaller and are decoded by clients without a JSON parse.
+"""
+
+import io
+import json
+from typing import Iterator, Tuple
+
+import pandas as pd
+
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None
+
+try:
+    import shapely
+except Exception:  # pragma: no cover
+    shapely = None
+
+GEOJSON_MEDIA_TYPE = 'application/geo+json'
+CHUNK_FEATURES = 2000
+
+MEDIA_TYPES = {
+    'geojson': GEOJSON_MEDIA_TYPE,
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'fgb': 'application/x-flatgeobuf',
+}
+FORMATS = tuple(MEDIA_TYPES)
+EXTENSIONS = {'geojson': '.geojson', 'arrow': '.arrow', 'fgb': '.fgb'}
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def _records(props: pd.DataFrame) -> list:
+    # NaN/NA -> null, numpy scalars -> Python scalars (same output as GeoDataFrame.to_json)
+    return props.astype(object).where(props.notna(), None).to_dict('records')
+
+
+def _crs_member(crs) -> bytes:
+    # Same named-CRS member GeoDataFrame.to_json adds for non-WGS84 layers (TIGER is NAD83)
+    if crs is None or crs.equals('epsg:4326'):
+        return b''
+    auth = crs.to_authority()
+    if auth is None or auth[0] not in ('EDCS', 'EPSG', 'OGC', 'SI', 'UCUM'):
+        return b''
+    name = f'urn:ogc:def:crs:{auth[0]}::{auth[1]}'
+    return b',"crs":' + _dumps({'type': 'name', 'properties': {'name': name}})
+
+
+def iter_geojson(gdf, chunk_size: int = CHUNK_FEATURES) -> Iterator[bytes]:
+    """Yield a GeoJSON FeatureCollection in chunks of ``chunk_size`` features."""
+    geom_col = gdf.geometry.name
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    for start in range(0, len(gdf), chunk_size):
+        chunk = gdf.iloc[start:start + chunk_size]
+        geoms = shapely.to_geojson(chunk.geometry.values)
+        ids = chunk.index.astype(str)
+        records = _records(chunk.drop(columns=[geom_col]))
+        parts = []
+        for fid, rec, geom in zip(ids, records, geoms):
+            parts.append(
+                b'{"id":' + _dumps(fid)
+                + b',"type":"Feature","properties":' + _dumps(rec)
+                + b',"geometry":' + (geom.encode('utf-8') if geom is not None else b'null')
+                + b'}'
+            )
+        if parts:
+            yield (b'' if first else b',') + b','.join(parts)
+            first = False
+    yield b']' + _crs_member(gdf.crs) + b'}'
+
+
+def _arrow_table(gdf):
+    import pyarrow as pa
+    # GeoArrow native coordinates (geoarrow.multipolygon etc.), CRS in field metadata
+    return pa.table(gdf.to_arrow(geometry_encoding='geoarrow', index=False))
+
+
+def iter_arrow_ipc(gdf, chunk_size: int = CHUNK_FEATURES) -> Iterator[bytes]:
+    """Yield an Arrow IPC stream (schema, then one message per record batch)."""
+    import pyarrow as pa
+
+    table = _arrow_table(gdf)
+    buf = io.BytesIO()
+    with pa.ipc.new_stream(buf, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            writer.write_batch(batch)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def flatgeobuf_bytes(gdf) -> bytes:
+    import pyogrio
+
+    buf = io.BytesIO()
+    pyogrio.write_dataframe(gdf, buf, driver='FlatGeobuf', layer='boundaries')
+    return buf.getvalue()
+
+
+def iter_flatgeobuf(gdf) -> Iterator[bytes]:
+    # FlatGeobuf is written in one go; deferred so it runs when the body is consumed
+    yield flatgeobuf_bytes(gdf)
+
+
+def encode(gdf, fmt: str = 'geojson') -> Tuple[Iterator[bytes], str]:
+    """Body iterator and media type for ``fmt`` (one of FORMATS)."""
+    if fmt == 'geojson':
+        return iter_geojson(gdf), MEDIA_TYPES[fmt]
+    if fmt == 'arrow':
+        return iter_arrow_ipc(gdf), MEDIA_TYPES[fmt]
+    if fmt == 'fgb':
+        return iter_flatgeobuf(gdf), MEDIA_TYPES[fmt]
+    raise ValueError(f"unsupported format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+# Attribute-only tables (no geometry), e.g. /join with attributes=true
+ATTRIBUTE_MEDIA_TYPES = {
+    'json': 'application/json',
+    'arrow': MEDIA_TYPES['arrow'],
+}
+
+
+def iter_columnar_json(df, meta: dict) -> Iterator[bytes]:
+    """Yield ``{<meta>..., "columns": {name: [values]}}``; one array per column."""
+    yield _dumps(meta)[:-1] + (b',' if meta else b'') + b'"columns":{'
+    for i, col in enumerate(df.columns):
+        values = df[col].astype(object).where(df[col].notna(), None).tolist()
+        yield (b',' if i else b'') + _dumps(str(col)) + b':' + _dumps(values)
+    yield b'}}'
+
+
+def iter_attribute_ipc(df, meta: dict) -> Iterator[bytes]:
+    """Arrow IPC stream of ``df`` with ``meta`` as JSON in the schema metadata."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'meta': _dumps(meta)})
+    buf = io.BytesIO()
+    with pa.ipc.new_stream(buf, table.schema) as writer:
+        writer.write_table(table, max_chunksize=CHUNK_FEATURES * 10)
+    yield buf.getvalue()
+
+
+def encode_attributes(df, meta: dict, fmt: str = 'json') -> Tuple[Iterator[bytes], str]:
+    if fmt == 'json':
+        return iter_columnar_json(df, meta), ATTRIBUTE_MEDIA_TYPES[fmt]
+    if fmt == 'arrow':
+        return iter_attribute_ipc(df, meta), ATTRIBUTE_MEDIA_TYPES[fmt]
+    raise ValueError(f"unsupported attribute format {fmt!r} (expected one of {', '.join(ATTRIBUTE_MEDIA_TYPES)})")
+
+
+def write_boundary(gdf, path: str, fmt: str = 'geojson') -> None:
+    if fmt == 'geojson':
+        gdf.to_file(path, driver='GeoJSON')
+        return
+    if fmt == 'arrow':
+        import pyarrow as pa
+
+        table = _arrow_table(gdf)
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return
+    if fmt == 'fgb':
+        gdf.to_file(path, driver='FlatGeobuf')
+        return
+    raise ValueError(f"unsupported format {fmt!r} (expected one of {', '.join(FORMATS)})")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Shared output stage for the static boundary generators.
+
+Each layer is written as minified GeoJSON and, unless CHOROPLETH_TOPOJSON=0,
+as quantized TopoJSON (``<name>.topo.json``) in which borders shared by
+neighbouring polygons are stored once. A size report compares the two.
+Layers are simplified along those same shared borders, so neighbours never
+end up with gaps or slivers between them.
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from lod import simplify_layer
+from topology import build_topology
+
+# Grid resolution for TopoJSON coordinates (same default as the topojson CLI)
+QUANTIZATION = int(os.environ.get('CHOROPLETH_TOPOJSON_QUANTIZATION', '100000'))
+WRITE_TOPOJSON = os.environ.get('CHOROPLETH_TOPOJSON', '1') != '0'
+
+
+def simplify_geometry(gdf, tolerance: float):
+    """Simplify with ``tolerance`` in EPSG:3857 metres; returns WGS84 for the web."""
+    return simplify_layer(gdf, tolerance, crs='EPSG:4326')
+
+
+def _clean(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        return _clean(value.item())
+    return value
+
+
+def _fmt_size(n_bytes: int) -> str:
+    kb = n_bytes / 1024
+    return f"{kb / 1024:.1f} MB" if kb > 1024 else f"{kb:.1f} KB"
+
+
+def write_geojson(gdf, output_file: Path, id_field: Optional[str] = None) -> int:
+    """Minified GeoJSON with ``feature.id`` taken from ``id_field``; returns bytes written."""
+    geojson = json.loads(gdf.to_json())
+    if id_field:
+        for feature in geojson['features']:
+            if id_field in feature['properties']:
+                feature['id'] = feature['properties'][id_field]
+    with open(output_file, 'w') as f:
+        json.dump(geojson, f, separators=(',', ':'))
+    return output_file.stat().st_size
+
+
+def to_topojson(gdf, object_name: str, id_field: Optional[str] = None, quantization: int = QUANTIZATION) -> dict:
+    topo = build_topology(gdf.geometry.values, quantization=quantization)
+    props = gdf.drop(columns=[gdf.geometry.name])
+    records = props.to_dict('records')
+
+    geometries = []
+    for rec, polys in zip(records, topo.geometries):
+        rec = {k: _clean(v) for k, v in rec.items()}
+        if polys is None:
+            geom = {'type': None}
+        elif len(polys) == 1:
+            geom = {'type': 'Polygon', 'arcs': polys[0]}
+        else:
+            geom = {'type': 'MultiPolygon', 'arcs': polys}
+        if id_field and rec.get(id_field) is not None:
+            geom['id'] = rec[id_field]
+        geom['properties'] = rec
+        geometries.append(geom)
+
+    arcs = []
+    for arc in topo.arcs:
+        if topo.transform is not None:
+            # Delta-encoded integer positions
+            deltas = np.diff(arc, axis=0, prepend=np.zeros((1, 2), dtype=arc.dtype))
+            arcs.append(deltas.tolist())
+        else:
+            arcs.append(arc.tolist())
+
+    out = {
+        'type': 'Topology',
+        'bbox': list(topo.bbox),
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs,
+    }
+    if topo.transform is not None:
+        sx, sy, tx, ty = topo.transform
+        out['transform'] = {'scale': [sx, sy], 'translate': [tx, ty]}
+    return out
+
+
+def write_topojson(gdf, output_file: Path, object_name: str, id_field: Optional[str] = None,
+                   quantization: int = QUANTIZATION) -> int:
+    topology = to_topojson(gdf, object_name, id_field=id_field, quantization=quantization)
+    with open(output_file, 'w') as f:
+        json.dump(topology, f, separators=(',', ':'))
+    return output_file.stat().st_size
+
+
+def write_layer(gdf, output_dir: Path, filename: str, id_field: Optional[str] = None) -> dict:
+    """Write ``filename`` (GeoJSON) and its ``.topo.json`` sibling; print and return a size report."""
+    output_file = output_dir / filename
+    report = {'file': filename, 'geojson_bytes': write_geojson(gdf, output_file, id_field)}
+    print(f"  Saved {filename} ({_fmt_size(report['geojson_bytes'])})")
+    if WRITE_TOPOJSON:
+        stem = filename[:-len('.json')] if filename.endswith('.json') else filename
+        topo_name = f"{stem}.topo.json"
+        report['topojson_file'] = topo_name
+        report['topojson_bytes'] = write_topojson(gdf, output_dir / topo_name, object_name=stem, id_field=id_field)
+        ratio = report['topojson_bytes'] / report['geojson_bytes'] if report['geojson_bytes'] else 0.0
+        report['ratio'] = round(ratio, 3)
+        print(f"  Saved {topo_name} ({_fmt_size(report['topojson_bytes'])}, "
+              f"{ratio:.0%} of GeoJSON)")
+    return report
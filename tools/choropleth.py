@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 import argparse
-import io
+import csv
+import glob
+import multiprocessing
 import os
 import re
 import sys
 import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 
+from boundary_formats import EXTENSIONS, FORMATS, write_boundary
+from csv_ingest import read_csv
+from geoid import index_join, level_codes
+from metrics import add_metrics
+from zcta_index import read_zcta_state_index, zctas_for_state
+
 try:
     import geopandas as gpd  # type: ignore
 except Exception as e:  # pragma: no cover
@@ -22,6 +32,9 @@ CACHE_DIR: Optional[str] = None
 OFFLINE = False
 MAX_RETRIES = 6
 RETRY_WAIT = 2.0  # seconds (base; exponential backoff)
+# National layers read once per process, by URL (batch mode preloads them before forking workers)
+_LAYERS: Dict[str, 'gpd.GeoDataFrame'] = {}
+_RESOLVED: Dict[Tuple[str, ...], str] = {}
 
 
 # ---------------------------
@@ -94,6 +107,13 @@ def bg_url(state_fips: str):
     return f"{CB_BASE_2023}/cb_2023_{state_fips}_bg_500k.zip"
 
 def resolve_first_available(urls):
+    key = tuple(urls)
+    if key not in _RESOLVED:
+        _RESOLVED[key] = _resolve_first_available(urls)
+    return _RESOLVED[key]
+
+
+def _resolve_first_available(urls):
     import requests
     if OFFLINE and CACHE_DIR:
         for u in urls:
@@ -126,16 +146,9 @@ def require_geopandas():
 
 
 def read_csv_smart(path: str) -> pd.DataFrame:
-    # Handle potential UTF-8 BOM in header
-    with open(path, 'rb') as f:
-        raw = f.read()
-    buf = io.BytesIO(raw)
-    try:
-        df = pd.read_csv(buf, encoding='utf-8-sig')
-    except UnicodeDecodeError:
-        buf.seek(0)
-        df = pd.read_csv(buf)
-    return df
+    # Encoding sniffed from the first bytes (BOM / UTF-8 / Windows-1252), one pyarrow parse;
+    # GEOID/ZIP columns stay text so leading zeros survive
+    return read_csv(path)
 
 
 def _cache_path_for(url: str) -> Optional[str]:
@@ -189,11 +202,27 @@ def read_geodata_from_zip(url: str, layer_hint: Optional[str] = None) -> 'gpd.Ge
     return gdf
 
 
+def national_layer(url: str) -> 'gpd.GeoDataFrame':
+    # A US-wide layer (places, ZCTAs, states), read once per process; treat as read-only
+    if url not in _LAYERS:
+        _LAYERS[url] = read_geodata_from_zip(url)
+    return _LAYERS[url]
+
+
 # ---------------------------
 # Join logic per geography
 # ---------------------------
+def csv_codes(df: pd.DataFrame, col: str, level: str):
+    # Integer GEOID/ZIP codes for df[col]; unparseable rows are reported and left unmatched
+    codes, invalid = level_codes(level, df[col])
+    if invalid.any():
+        sample = ', '.join(map(str, df.loc[invalid, col].head(5).tolist()))
+        print(f"Warning: {int(invalid.sum())} CSV rows have an unusable {col} (e.g. {sample})", file=sys.stderr)
+    return codes
+
+
 def prepare_place(state_abbr: str, state_fips: str, csv_path: str) -> 'gpd.GeoDataFrame':
-    gdf = read_geodata_from_zip(place_url())
+    gdf = national_layer(place_url())
     # Filter to state
     gdf = gdf[gdf['STATEFP'] == state_fips]
 
@@ -201,9 +230,9 @@ def prepare_place(state_abbr: str, state_fips: str, csv_path: str) -> 'gpd.GeoDa
     # Expect a 7-digit GEOID for place
     if 'GEOID' not in df.columns:
         raise ValueError("CSV missing GEOID column for place level")
-    df['GEOID'] = df['GEOID'].astype(str).str.zfill(7)
+    codes = csv_codes(df, 'GEOID', 'place')
 
-    merged = gdf.merge(df, how='left', on='GEOID')
+    merged = index_join(gdf, df, level_codes('place', gdf['GEOID'])[0], codes, on=('GEOID',))
     return merged
 
 
@@ -213,14 +242,14 @@ def prepare_cousub(state_abbr: str, state_fips: str, csv_path: str) -> 'gpd.GeoD
     # Expect 10-digit GEOID: state(2)+county(3)+cousub(5)
     if 'GEOID' not in df.columns:
         raise ValueError("CSV missing GEOID column for Sub_County level")
-    df['GEOID'] = df['GEOID'].astype(str).str.zfill(10)
-    merged = gdf.merge(df, how='left', on='GEOID')
+    codes = csv_codes(df, 'GEOID', 'subcounty')
+    merged = index_join(gdf, df, level_codes('subcounty', gdf['GEOID'])[0], codes, on=('GEOID',))
     return merged
 
 
 def prepare_zcta(state_abbr: str, state_fips: str, csv_path: str) -> 'gpd.GeoDataFrame':
     url = resolve_first_available(zcta_urls())
-    gdf = read_geodata_from_zip(url)
+    gdf = national_layer(url)
     # ZCTA fields: commonly ZCTA5CE20 and GEOID20 (5-digit string)
     geoid_field = 'GEOID20' if 'GEOID20' in gdf.columns else ('GEOID10' if 'GEOID10' in gdf.columns else None)
     zcta_field = 'ZCTA5CE20' if 'ZCTA5CE20' in gdf.columns else ('ZCTA5CE10' if 'ZCTA5CE10' in gdf.columns else None)
@@ -236,18 +265,23 @@ def prepare_zcta(state_abbr: str, state_fips: str, csv_path: str) -> 'gpd.GeoDat
             break
     if not zip_col:
         raise ValueError("CSV missing ZIP/ZCTA column for ZIP level")
-    df['_ZCTA5'] = df[zip_col].astype(str).str.extract(r"(\d+)")[0].str.zfill(5)
+    codes = csv_codes(df, zip_col, 'zcta')
 
     key = geoid_field or zcta_field
-    gdf['_ZCTA5'] = gdf[key].astype(str).str.zfill(5)
+    gdf = gdf.assign(_ZCTA5=gdf[key].astype(str).str.zfill(5))
+
+    merged = index_join(gdf, df, level_codes('zcta', gdf[key])[0], codes)
 
-    merged = gdf.merge(df, how='left', left_on='_ZCTA5', right_on='_ZCTA5')
+    # Prefer the offline ZCTA->state index (convert_cache_to_parquet.py) when cached
+    index = read_zcta_state_index(os.path.join(CACHE_DIR, 'parquet')) if CACHE_DIR else None
+    if index is not None:
+        return merged[merged['_ZCTA5'].isin(zctas_for_state(index, state_abbr))]
 
     # Optional: filter to state using state boundary overlay to reduce size.
     # Simpler heuristic: keep ZCTAs whose centroid lies within the state boundary.
     try:
         states_url = state_us_url()
-        states = read_geodata_from_zip(states_url)
+        states = national_layer(states_url)
         state_poly = states.loc[states['STUSPS'] == state_abbr, 'geometry'].values[0]
         merged = merged.set_geometry('geometry')
         merged = merged[merged.geometry.centroid.within(state_poly)]
@@ -258,84 +292,99 @@ def prepare_zcta(state_abbr: str, state_fips: str, csv_path: str) -> 'gpd.GeoDat
     return merged
 
 
-def compute_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    # Add commonly useful rates for choropleths
-    cols = df.columns
-    needed = ['Households', 'Poverty Households', 'ALICE Households']
-    if all(c in cols for c in needed):
-        hh = df['Households'].astype(float)
-        below = df['Poverty Households'].astype(float) + df['ALICE Households'].astype(float)
-        with pd.option_context('mode.chained_assignment', None):
-            df['Below_ALICE_Rate'] = (below / hh).where(hh > 0)
-            df['Poverty_Rate'] = (df['Poverty Households'].astype(float) / hh).where(hh > 0)
-            df['ALICE_Rate'] = (df['ALICE Households'].astype(float) / hh).where(hh > 0)
-    return df
-
-
 # ---------------------------
 # CLI
 # ---------------------------
+LEVELS = ('place', 'subcounty', 'zcta')
+
+
 @dataclass
 class Args:
-    level: str
-    state: str
-    csv: str
-    out: str
+    level: Optional[str]
+    state: Optional[str]
+    csv: Optional[str]
+    out: Optional[str]
     insecure: bool
     cache_dir: Optional[str]
     offline: bool
     max_retries: int
     retry_wait: float
+    format: str = 'geojson'
+    batch: Optional[str] = None
+    csv_glob: Optional[str] = None
+    out_dir: Optional[str] = None
+    workers: Optional[int] = None
 
 
 def parse_args(argv=None) -> Args:
-    p = argparse.ArgumentParser(description="Join ALICE CSVs to TIGER geometries and export GeoJSON")
-    p.add_argument('--level', required=True, choices=['place', 'subcounty', 'zcta'], help='Geography level to join')
-    p.add_argument('--state', required=True, help='State 2-letter (e.g., FL) or 2-digit FIPS (e.g., 12)')
-    p.add_argument('--csv', required=True, help='Path to the ALICE CSV for the chosen level')
-    p.add_argument('--out', required=True, help='Output GeoJSON path')
+    p = argparse.ArgumentParser(description="Join ALICE CSVs to TIGER geometries and export GeoJSON (or FlatGeobuf / Arrow IPC)")
+    p.add_argument('--level', choices=list(LEVELS), help='Geography level to join')
+    p.add_argument('--state', help='State 2-letter (e.g., FL) or 2-digit FIPS (e.g., 12)')
+    p.add_argument('--csv', help='Path to the ALICE CSV for the chosen level')
+    p.add_argument('--out', help='Output path (GeoJSON unless --format is given)')
+    p.add_argument('--batch', help='Manifest CSV with columns level,state,csv[,out]: run every row in one process')
+    p.add_argument('--csv-glob', help="Glob with a {state} placeholder (e.g. 'data/{state}_place.csv'): one job per matching CSV at --level")
+    p.add_argument('--out-dir', help='Batch output directory for jobs without an out path (default: current directory)')
+    p.add_argument('--workers', type=int, help='Batch worker processes (default: CPU count)')
     p.add_argument('--insecure', action='store_true', help='Disable TLS verification when downloading TIGER files')
     p.add_argument('--cache-dir', help='Directory to cache TIGER zip files for reuse/offline')
     p.add_argument('--offline', action='store_true', help='Use only cached files; do not attempt network downloads')
     p.add_argument('--max-retries', type=int, default=MAX_RETRIES, help='Max HTTP retries for downloads (default 6)')
     p.add_argument('--retry-wait', type=float, default=RETRY_WAIT, help='Base seconds for exponential backoff (default 2.0)')
     p.add_argument('--simplify', type=float, help='Douglas-Peucker tolerance in degrees to simplify geometry (e.g., 0.0005)')
+    p.add_argument('--format', choices=list(FORMATS), default='geojson', help='Output format: geojson (default), fgb (FlatGeobuf) or arrow (Arrow IPC with GeoArrow geometry)')
     ns = p.parse_args(argv)
+    if ns.batch and ns.csv_glob:
+        p.error('use either --batch or --csv-glob')
+    if ns.csv_glob and not ns.level:
+        p.error('--csv-glob needs --level')
+    if not (ns.batch or ns.csv_glob) and not (ns.level and ns.state and ns.csv and ns.out):
+        p.error('--level, --state, --csv and --out are required (or use --batch / --csv-glob)')
     # Extend Args dynamically with simplify without changing dataclass signature for brevity
-    args_obj = Args(level=ns.level, state=ns.state, csv=ns.csv, out=ns.out, insecure=ns.insecure, cache_dir=ns.cache_dir, offline=ns.offline, max_retries=ns.max_retries, retry_wait=ns.retry_wait)
+    args_obj = Args(level=ns.level, state=ns.state, csv=ns.csv, out=ns.out, insecure=ns.insecure, cache_dir=ns.cache_dir, offline=ns.offline, max_retries=ns.max_retries, retry_wait=ns.retry_wait, format=ns.format,
+                    batch=ns.batch, csv_glob=ns.csv_glob, out_dir=ns.out_dir, workers=ns.workers)
     setattr(args_obj, 'simplify', ns.simplify)
     return args_obj
 
 
-def main(argv=None) -> int:
-    args = parse_args(argv)
-    abbr, fips = normalize_state(args.state)
-
-    global INSECURE
-    INSECURE = bool(args.insecure or os.environ.get('CHOROPLETH_INSECURE'))
-    global CACHE_DIR, OFFLINE, MAX_RETRIES, RETRY_WAIT
-    CACHE_DIR = args.cache_dir or os.environ.get('CHOROPLETH_CACHE_DIR')
-    OFFLINE = bool(args.offline or os.environ.get('CHOROPLETH_OFFLINE'))
-    MAX_RETRIES = int(os.environ.get('CHOROPLETH_MAX_RETRIES', args.max_retries))
-    RETRY_WAIT = float(os.environ.get('CHOROPLETH_RETRY_WAIT', args.retry_wait))
-
-    if args.level == 'place':
-        gdf = prepare_place(abbr, fips, args.csv)
-    elif args.level == 'subcounty':
-        gdf = prepare_cousub(abbr, fips, args.csv)
+def configure(settings: dict) -> None:
+    global INSECURE, CACHE_DIR, OFFLINE, MAX_RETRIES, RETRY_WAIT
+    INSECURE = settings['insecure']
+    CACHE_DIR = settings['cache_dir']
+    OFFLINE = settings['offline']
+    MAX_RETRIES = settings['max_retries']
+    RETRY_WAIT = settings['retry_wait']
+
+
+def settings_from(args: Args) -> dict:
+    return {
+        'insecure': bool(args.insecure or os.environ.get('CHOROPLETH_INSECURE')),
+        'cache_dir': args.cache_dir or os.environ.get('CHOROPLETH_CACHE_DIR'),
+        'offline': bool(args.offline or os.environ.get('CHOROPLETH_OFFLINE')),
+        'max_retries': int(os.environ.get('CHOROPLETH_MAX_RETRIES', args.max_retries)),
+        'retry_wait': float(os.environ.get('CHOROPLETH_RETRY_WAIT', args.retry_wait)),
+    }
+
+
+def build(level: str, abbr: str, fips: str, csv_path: str, out: str, fmt: str = 'geojson',
+          simplify: Optional[float] = None) -> int:
+    """Join ``csv_path`` to the ``level`` boundaries of one state and write ``out``; returns the feature count."""
+    if level == 'place':
+        gdf = prepare_place(abbr, fips, csv_path)
+    elif level == 'subcounty':
+        gdf = prepare_cousub(abbr, fips, csv_path)
     else:
-        gdf = prepare_zcta(abbr, fips, args.csv)
+        gdf = prepare_zcta(abbr, fips, csv_path)
 
     # Compute common metrics and write GeoJSON
     gdf = gdf.pipe(lambda df: df.set_geometry('geometry') if 'geometry' in df else df)
     gdf = gdf.copy()
-    gdf = gdf.assign(**compute_metrics(gdf))
+    gdf = add_metrics(gdf)
 
     # Optional simplify
-    simp = getattr(args, 'simplify', None)
-    if simp and hasattr(gdf, 'geometry'):
+    if simplify and hasattr(gdf, 'geometry'):
         try:
-            gdf['geometry'] = gdf.geometry.simplify(simp, preserve_topology=True)
+            gdf['geometry'] = gdf.geometry.simplify(simplify, preserve_topology=True)
         except Exception:
             pass
 
@@ -346,8 +395,147 @@ def main(argv=None) -> int:
 
     # Write
     require_geopandas()
-    gdf.to_file(args.out, driver='GeoJSON')
-    print(f"Wrote {args.out} ({len(gdf)} features)")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    write_boundary(gdf, out, fmt)
+    return len(gdf)
+
+
+# ---------------------------
+# Batch mode
+# ---------------------------
+@dataclass
+class Job:
+    level: str
+    abbr: str
+    fips: str
+    csv: str
+    out: str
+
+
+def default_out(out_dir: Optional[str], abbr: str, level: str, fmt: str) -> str:
+    return os.path.join(out_dir or '.', f"{abbr.lower()}_{level}{EXTENSIONS[fmt]}")
+
+
+def manifest_jobs(path: str, out_dir: Optional[str], fmt: str) -> List[Job]:
+    # Relative csv/out paths are taken from the manifest's directory
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for n, row in enumerate(csv.DictReader(f), start=2):
+            row = {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+            level = row.get('level', '')
+            if level not in LEVELS:
+                raise ValueError(f"{path}:{n}: level must be one of {', '.join(LEVELS)} (got {level!r})")
+            abbr, fips = normalize_state(row.get('state', ''))
+            if not row.get('csv'):
+                raise ValueError(f"{path}:{n}: missing csv")
+            out = os.path.join(base, row['out']) if row.get('out') else default_out(out_dir, abbr, level, fmt)
+            jobs.append(Job(level, abbr, fips, os.path.join(base, row['csv']), out))
+    return jobs
+
+
+def glob_jobs(pattern: str, level: str, out_dir: Optional[str], fmt: str) -> List[Job]:
+    # {state} is tried as each state's abbreviation (upper and lower case) and FIPS code
+    if '{state}' not in pattern:
+        raise ValueError("--csv-glob must contain a {state} placeholder")
+    jobs = []
+    seen = set()
+    for abbr, fips in STATE_ABBR_TO_FIPS.items():
+        for token in dict.fromkeys((abbr, abbr.lower(), fips)):
+            for path in sorted(glob.glob(pattern.replace('{state}', token))):
+                # On case-insensitive filesystems 'FL' and 'fl' match the same file
+                real = os.path.normcase(os.path.realpath(path))
+                if real in seen:
+                    continue
+                seen.add(real)
+                jobs.append(Job(level, abbr, fips, path, default_out(out_dir, abbr, level, fmt)))
+    if not jobs:
+        raise ValueError(f"no CSVs match {pattern}")
+    return jobs
+
+
+def preload_layers(levels) -> float:
+    # Read the national layers the jobs share once, before the workers start
+    t0 = time.perf_counter()
+    if 'place' in levels:
+        national_layer(place_url())
+    if 'zcta' in levels:
+        national_layer(resolve_first_available(zcta_urls()))
+        index = read_zcta_state_index(os.path.join(CACHE_DIR, 'parquet')) if CACHE_DIR else None
+        if index is None:
+            national_layer(state_us_url())
+    return time.perf_counter() - t0
+
+
+def _pool_context():
+    # fork hands the preloaded layers to every worker copy-on-write. Without it (Windows) the
+    # layers are not shipped: pickling national GeoDataFrames per worker costs more than each
+    # worker reading them itself, so spawned workers fill _LAYERS on first use.
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def _init_worker(settings: dict, resolved: dict) -> None:
+    configure(settings)
+    _RESOLVED.update(resolved)
+
+
+def _run_job(job: Job, fmt: str, simplify: Optional[float]) -> Tuple[Optional[int], float, Optional[str]]:
+    # (features written, seconds, error); a failed job does not stop the batch
+    t0 = time.perf_counter()
+    try:
+        n = build(job.level, job.abbr, job.fips, job.csv, job.out, fmt, simplify)
+        return n, time.perf_counter() - t0, None
+    except Exception as e:
+        return None, time.perf_counter() - t0, f"{type(e).__name__}: {e}"
+
+
+def run_batch(args: Args, settings: dict) -> int:
+    try:
+        if args.batch:
+            jobs = manifest_jobs(args.batch, args.out_dir, args.format)
+        else:
+            jobs = glob_jobs(args.csv_glob, args.level, args.out_dir, args.format)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"error: {e}")
+    simplify = getattr(args, 'simplify', None)
+    t_start = time.perf_counter()
+    t_load = preload_layers({j.level for j in jobs})
+    print(f"{len(jobs)} jobs; national layers loaded in {t_load:.1f}s")
+
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(jobs)))
+    if workers == 1:
+        results = [_run_job(j, args.format, simplify) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(), initializer=_init_worker,
+                                 initargs=(settings, dict(_RESOLVED))) as pool:
+            results = list(pool.map(_run_job, jobs, [args.format] * len(jobs), [simplify] * len(jobs)))
+
+    failed = 0
+    print(f"{'level':<10} {'state':<5} {'features':>8} {'seconds':>8}  output")
+    for job, (n, secs, err) in zip(jobs, results):
+        if err:
+            failed += 1
+            print(f"{job.level:<10} {job.abbr:<5} {'-':>8} {secs:8.2f}  FAILED {err}")
+        else:
+            print(f"{job.level:<10} {job.abbr:<5} {n:>8} {secs:8.2f}  {job.out}")
+    total = time.perf_counter() - t_start
+    print(f"{len(jobs) - failed}/{len(jobs)} written in {total:.1f}s ({workers} worker{'s' if workers > 1 else ''})")
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    settings = settings_from(args)
+    configure(settings)
+    if args.batch or args.csv_glob:
+        return run_batch(args, settings)
+
+    abbr, fips = normalize_state(args.state)
+    n = build(args.level, abbr, fips, args.csv, args.out, args.format, getattr(args, 'simplify', None))
+    print(f"Wrote {args.out} ({n} features)")
     return 0
 
 
@@ -1,25 +1,200 @@
 #!/usr/bin/env python3
 import argparse
 import glob
+import hashlib
+import json
 import os
-from typing import Iterable
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Optional, Tuple
 
 import geopandas as gpd
+import pandas as pd
 
+from arrow_store import store_path, write_store
+from lod import LOD_TOLERANCES, lod_name, simplify_levels
+from zcta_index import INDEX_NAME, build_zcta_state_index, zcta_key_column
 
-def to_parquet(zip_path: str, out_dir: str) -> str:
-    base = os.path.basename(zip_path)
-    name = os.path.splitext(base)[0] + ".parquet"
-    out_path = os.path.join(out_dir, name)
-    if os.path.exists(out_path):
-        print(f"parquet cached: {name}")
-        return out_path
-    ds = f"zip://{zip_path}"
-    gdf = gpd.read_file(ds)
+STATE_LAYER = "cb_2023_us_state_500k"
+ZCTA_LAYER = "cb_2020_us_zcta520_500k"
+# National layers also written as a Hive-style dataset split by STATEFP,
+# so the local engine can read a single state's partition instead of the whole file,
+# and as a memory-mapped Arrow store (arrow_store.py) its worker processes share
+PARTITIONED_LAYERS = ["cb_2023_us_place_500k", "cb_2023_us_county_500k", ZCTA_LAYER]
+
+# Source zip signature per output file, to rebuild only what changed
+MANIFEST_NAME = "manifest.json"
+# Rows are written in Hilbert order, so each row group covers a compact area and
+# the bbox covering column lets bbox reads skip most of a national file
+ROW_GROUP_SIZE = 10000
+PARQUET_OPTIONS = {'compression': 'zstd', 'row_group_size': ROW_GROUP_SIZE, 'write_covering_bbox': True}
+
+
+def write_geoparquet(gdf: gpd.GeoDataFrame, out_path: str) -> None:
+    geoms = gdf.geometry
+    if len(gdf) and not (geoms.isna() | geoms.is_empty).any():
+        gdf = gdf.iloc[geoms.hilbert_distance().argsort()].reset_index(drop=True)
+    tmp = out_path + '.tmp'
+    gdf.to_parquet(tmp, **PARQUET_OPTIONS)
+    os.replace(tmp, out_path)
+
+
+def source_signature(zip_path: str, with_hash: bool = False) -> Dict[str, object]:
+    st = os.stat(zip_path)
+    sig: Dict[str, object] = {'source': os.path.basename(zip_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if with_hash:
+        h = hashlib.sha256()
+        with open(zip_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        sig['sha256'] = h.hexdigest()
+    return sig
+
+
+def load_manifest(out_dir: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(out_dir: str, manifest: Dict[str, dict]) -> None:
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def is_current(out_path: str, entry: Optional[dict], sig: Dict[str, object]) -> bool:
+    if not os.path.exists(out_path):
+        return False
+    if entry is None:
+        # Written before the manifest existed: trust it unless the zip is newer
+        return os.path.getmtime(out_path) >= sig['mtime_ns'] / 1e9
+    if 'sha256' in sig and entry.get('sha256') == sig['sha256']:
+        return True
+    return all(entry.get(k) == sig[k] for k in ('source', 'size', 'mtime_ns'))
+
+
+def parquet_name(zip_path: str) -> str:
+    return os.path.splitext(os.path.basename(zip_path))[0] + ".parquet"
+
+
+def to_parquet(zip_path: str, out_dir: str) -> Tuple[str, int]:
+    out_path = os.path.join(out_dir, parquet_name(zip_path))
+    gdf = gpd.read_file(f"zip://{zip_path}")
     os.makedirs(out_dir, exist_ok=True)
-    gdf.to_parquet(out_path)
-    print(f"wrote: {name} ({len(gdf)} features)")
-    return out_path
+    write_geoparquet(gdf, out_path)
+    return out_path, len(gdf)
+
+
+def convert_one(zip_path: str, out_dir: str, tolerances: Iterable[int], rebuild: bool = True) -> Tuple[str, Optional[int], float]:
+    # Runs in a worker process: zip -> parquet (when stale), then any missing levels of detail
+    t0 = time.time()
+    if rebuild:
+        out_path, n = to_parquet(zip_path, out_dir)
+    else:
+        out_path, n = os.path.join(out_dir, parquet_name(zip_path)), None
+    write_lods(out_path, tolerances)
+    return out_path, n, time.time() - t0
+
+
+def write_lods(parquet_path: str, tolerances: Iterable[int]) -> None:
+    # <base>.lod<metres>m.parquet next to the full-resolution file, one per tolerance
+    base = os.path.splitext(parquet_path)[0]
+    src_mtime = os.path.getmtime(parquet_path)
+    stale = [
+        tol for tol in tolerances
+        if not (os.path.exists(lod_name(base, tol) + ".parquet")
+                and os.path.getmtime(lod_name(base, tol) + ".parquet") >= src_mtime)
+    ]
+    if not stale:
+        return
+    for tol, lod in simplify_levels(gpd.read_parquet(parquet_path), stale):
+        out_path = lod_name(base, tol) + ".parquet"
+        write_geoparquet(lod, out_path)
+        print(f"wrote: {os.path.basename(out_path)}")
+
+
+def write_zcta_index(out_dir: str) -> None:
+    zcta_path = os.path.join(out_dir, ZCTA_LAYER + ".parquet")
+    states_path = os.path.join(out_dir, STATE_LAYER + ".parquet")
+    if not (os.path.exists(zcta_path) and os.path.exists(states_path)):
+        return
+    out_path = os.path.join(out_dir, INDEX_NAME)
+    if os.path.exists(out_path) and os.path.getmtime(out_path) >= max(os.path.getmtime(zcta_path), os.path.getmtime(states_path)):
+        print(f"zcta index cached: {INDEX_NAME}")
+        return
+    index = build_zcta_state_index(gpd.read_parquet(zcta_path), gpd.read_parquet(states_path))
+    index.to_parquet(out_path, index=False, compression='zstd')
+    print(f"wrote: {INDEX_NAME} ({len(index)} ZCTAs)")
+
+
+def write_partitioned(gdf: gpd.GeoDataFrame, root: str, key: str = 'STATEFP') -> int:
+    # <root>/STATEFP=12/part-0.parquet; the key lives in the path, not the file
+    tmp = root + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    n = 0
+    for value, part in gdf.groupby(key, sort=True):
+        pdir = os.path.join(tmp, f'{key}={value}')
+        os.makedirs(pdir, exist_ok=True)
+        write_geoparquet(part.drop(columns=[key]).reset_index(drop=True), os.path.join(pdir, 'part-0.parquet'))
+        n += 1
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+    return n
+
+
+def with_state_key(gdf: gpd.GeoDataFrame, base: str, out_dir: str) -> Optional[gpd.GeoDataFrame]:
+    # ZCTAs have no STATEFP: it comes from the ZCTA index (None until that is built)
+    if not base.startswith(ZCTA_LAYER):
+        return gdf
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    if not os.path.exists(index_path):
+        return None
+    index = pd.read_parquet(index_path, columns=['ZCTA5', 'STATEFP'])
+    zkey = gdf[zcta_key_column(gdf.columns)].astype(str).str.zfill(5)
+    return gdf.assign(STATEFP=zkey.map(index.set_index('ZCTA5')['STATEFP']))
+
+
+def _is_fresh(out: str, base: str, out_dir: str) -> bool:
+    deps = [os.path.join(out_dir, base + ".parquet")]
+    if base.startswith(ZCTA_LAYER):
+        deps.append(os.path.join(out_dir, INDEX_NAME))
+    return os.path.exists(out) and all(os.path.exists(d) and os.path.getmtime(out) >= os.path.getmtime(d) for d in deps)
+
+
+def partition_layer(base: str, out_dir: str) -> Optional[str]:
+    src = os.path.join(out_dir, base + ".parquet")
+    if not os.path.exists(src):
+        return None
+    root = os.path.join(out_dir, 'partitioned', base)
+    if _is_fresh(root, base, out_dir):
+        return f"partitions cached: {base}"
+    gdf = with_state_key(gpd.read_parquet(src), base, out_dir)
+    if gdf is None:
+        return f"skip partitions {base}: needs {INDEX_NAME} to assign states"
+    # ZCTAs without an assigned state are dropped, as a state request never returned them
+    gdf = gdf[gdf['STATEFP'].notna()]
+    os.makedirs(os.path.dirname(root), exist_ok=True)
+    n = write_partitioned(gdf, root)
+    return f"partitioned: {base} ({n} states)"
+
+
+def store_layer(base: str, out_dir: str) -> Optional[str]:
+    src = os.path.join(out_dir, base + ".parquet")
+    if not os.path.exists(src):
+        return None
+    out = store_path(out_dir, base)
+    if _is_fresh(out, base, out_dir):
+        return f"store cached: {base}"
+    gdf = with_state_key(gpd.read_parquet(src), base, out_dir)
+    if gdf is None:
+        return f"skip store {base}: needs {INDEX_NAME} to assign states"
+    n = write_store(gdf, out)
+    return f"stored: {os.path.basename(out)} ({n} states)"
 
 
 def iter_known_layers(cache_dir: str) -> Iterable[str]:
@@ -45,6 +220,10 @@ def parse_args():
     ap.add_argument('--cache-dir', required=True, help='Cache directory with TIGER ZIPs')
     ap.add_argument('--out-dir', help='Output directory for parquet (default <cache>/parquet)')
     ap.add_argument('--glob', help='Optional glob to limit files (e.g., "*_bg_500k.zip")')
+    ap.add_argument('--no-lod', action='store_true', help='Skip the simplified level-of-detail copies of each layer')
+    ap.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Worker processes (default: all cores)')
+    ap.add_argument('--hash', action='store_true', help='Also compare source SHA-256 (catches same-size, same-mtime replacements)')
+    ap.add_argument('--force', action='store_true', help='Rebuild every file regardless of the manifest')
     return ap.parse_args()
 
 
@@ -62,11 +241,57 @@ def main() -> int:
         print("No matching ZIPs found to convert.")
         return 0
 
+    tolerances = () if args.no_lod else LOD_TOLERANCES
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    t0 = time.time()
+
+    todo = []
     for p in paths:
+        name = parquet_name(p)
+        sig = source_signature(p, with_hash=args.hash)
+        rebuild = args.force or not is_current(os.path.join(out_dir, name), manifest.get(name), sig)
+        if not rebuild:
+            print(f"parquet cached: {name}")
+            manifest.setdefault(name, sig)
+        # Cached files still go through the pool: their levels of detail may be missing
+        todo.append((p, sig, rebuild))
+    # Largest first, so a national layer does not start last and hold up the run
+    todo.sort(key=lambda t: (t[2], t[1]['size']), reverse=True)
+
+    jobs = max(1, args.jobs)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(convert_one, p, out_dir, tolerances, rebuild): (p, sig) for p, sig, rebuild in todo}
+        for fut in as_completed(futures):
+            p, sig = futures[fut]
+            try:
+                out_path, n, secs = fut.result()
+            except Exception as e:
+                print(f"skip {os.path.basename(p)}: {e}")
+                continue
+            if n is not None:
+                manifest[os.path.basename(out_path)] = sig
+                save_manifest(out_dir, manifest)
+                print(f"wrote: {os.path.basename(out_path)} ({n} features, {secs:.1f}s)")
+        save_manifest(out_dir, manifest)
+
+        # The ZCTA index needs the state and ZCTA layers; partitions and stores need the index
         try:
-            to_parquet(p, out_dir)
+            write_zcta_index(out_dir)
         except Exception as e:
-            print(f"skip {os.path.basename(p)}: {e}")
+            print(f"skip {INDEX_NAME}: {e}")
+        bases = [b for layer in PARTITIONED_LAYERS for b in [layer] + [lod_name(layer, tol) for tol in tolerances]]
+        futures = {pool.submit(fn, b, out_dir): (fn, b) for b in bases for fn in (partition_layer, store_layer)}
+        for fut in as_completed(futures):
+            try:
+                msg = fut.result()
+            except Exception as e:
+                fn, b = futures[fut]
+                msg = f"skip {'partitions' if fn is partition_layer else 'store'} {b}: {e}"
+            if msg:
+                print(msg)
+    rebuilt = sum(1 for _, _, rebuild in todo if rebuild)
+    print(f"Converted {rebuilt} of {len(paths)} files with {jobs} workers in {time.time() - t0:.1f}s")
     print(f"Done. Parquet in {out_dir}")
     return 0
 
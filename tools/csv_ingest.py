@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+CSV reading shared by choropleth.py and the local engine.
+
+Uploads are spooled to a temp file in fixed-size chunks (hashed on the way),
+the encoding is picked from the first bytes only, and the file is parsed
+once by the multithreaded pyarrow CSV reader. Key columns are read as text
+so GEOIDs keep their leading zeros, and ``columns`` limits what is built.
+"""
+
+import codecs
+import csv
+import hashlib
+import io
+import os
+import tempfile
+from typing import Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except Exception:  # pragma: no cover
+    pa = None
+    pa_csv = None
+
+CHUNK_SIZE = 1 << 20
+SNIFF_BYTES = 64 * 1024
+
+# Join column candidates per level, most specific first
+KEY_CANDIDATES = {
+    'state': ['STATEFP', 'statefp', 'STATE', 'state', 'STUSPS', 'stusps', 'GEOID', 'FIPS'],
+    'county': ['GEOID', 'FIPS', 'FIPS5', 'COUNTYFP', 'CountyFIPS'],
+    'place': ['GEOID', 'PlaceGEOID'],
+    'subcounty': ['GEOID'],
+    'tract': ['GEOID'],
+    'bg': ['GEOID'],
+    'zcta': ['ZIP', 'Zip', 'zip', 'ZCTA', 'ZCTA5', 'GEOID'],
+}
+ALL_KEY_COLUMNS = tuple(dict.fromkeys(c for cands in KEY_CANDIDATES.values() for c in cands))
+
+
+class Spool:
+    """Write an upload to a temp file chunk by chunk, hashing as it goes."""
+
+    def __init__(self, dir: Optional[str] = None, suffix: str = '.csv'):
+        fd, self.path = tempfile.mkstemp(suffix=suffix, dir=dir)
+        self._file = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def close(self) -> None:
+        self._file.close()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def remove(self) -> None:
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def sniff_encoding(head: bytes) -> str:
+    """Encoding of a CSV from its first bytes: BOM, else UTF-8 if it decodes, else Windows-1252."""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8'
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+    try:
+        # Incremental, so a multi-byte character cut at the end of `head` is fine
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        # Excel on Windows
+        return 'cp1252'
+
+
+def read_header(path: str, encoding: Optional[str] = None) -> List[str]:
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    encoding = encoding or sniff_encoding(head)
+    text = head.decode('utf-8-sig' if encoding == 'utf-8' else encoding, errors='replace')
+    return next(csv.reader(io.StringIO(text)), [])
+
+
+def find_key_column(level: str, columns: Iterable[str], provided: Optional[str] = None) -> Optional[str]:
+    candidates = [provided] if provided else KEY_CANDIDATES.get(level, ['GEOID'])
+    present = set(columns)
+    return next((c for c in candidates if c in present), None)
+
+
+def read_csv(path: str, columns: Optional[Sequence[str]] = None,
+             string_columns: Sequence[str] = ALL_KEY_COLUMNS) -> pd.DataFrame:
+    """
+    Parse ``path`` into a DataFrame. ``columns`` (if given) are the only ones
+    read; any of ``string_columns`` present are kept as text.
+    """
+    with open(path, 'rb') as f:
+        encoding = sniff_encoding(f.read(SNIFF_BYTES))
+    header = read_header(path, encoding)
+    text_cols = [c for c in string_columns if c in header]
+    if columns is not None:
+        columns = [c for c in header if c in set(columns)]
+    if pa_csv is None:
+        return pd.read_csv(path, encoding='utf-8-sig' if encoding == 'utf-8' else encoding,
+                           usecols=columns, dtype={c: str for c in text_cols})
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(encoding=encoding, block_size=CHUNK_SIZE * 4),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in text_cols},
+            include_columns=columns,
+            timestamp_parsers=[],
+        ),
+    )
+    # Dates stay as written (what pandas' reader gave)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_temporal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table.to_pandas()
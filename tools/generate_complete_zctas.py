@@ -11,6 +11,8 @@ from pathlib import Path
 import requests
 from tqdm import tqdm
 
+from boundary_output import simplify_geometry, write_layer
+
 # Directories
 DATA_DIR = Path.home() / "data" / "tiger" / "GENZ"
 OUTPUT_DIR = Path(__file__).parent.parent / "docs" / "boundaries_complete"
@@ -41,14 +43,6 @@ def download_zcta_if_needed():
     
     return zcta_files[0]
 
-def simplify_geometry(gdf, tolerance=0.01):
-    """Simplify geometries to reduce file size."""
-    # Project to Web Mercator for simplification
-    gdf_projected = gdf.to_crs('EPSG:3857')
-    gdf_projected['geometry'] = gdf_projected.geometry.simplify(tolerance=tolerance)
-    # Project back to WGS84
-    return gdf_projected.to_crs('EPSG:4326')
-
 def process_complete_zctas():
     """Process ALL US ZCTA boundaries."""
     print("\n=== Processing Complete US ZIP Codes (ZCTAs) ===")
@@ -86,23 +80,9 @@ def process_complete_zctas():
             gdf_simplified = gdf_simplified[['GEOID20', 'geometry']]
             gdf_simplified.columns = ['ZCTA', 'geometry']
         
-        # Convert to GeoJSON
-        print(f"  Converting to GeoJSON...")
-        geojson = json.loads(gdf_simplified.to_json())
-        
-        # Add ID field for each feature
-        for feature in geojson['features']:
-            if 'ZCTA' in feature['properties']:
-                feature['id'] = feature['properties']['ZCTA']
-        
-        # Save to file
-        output_file = OUTPUT_DIR / filename
+        # Save GeoJSON (+ TopoJSON) with an id per feature
         print(f"  Saving {filename}...")
-        with open(output_file, 'w') as f:
-            json.dump(geojson, f, separators=(',', ':'))
-        
-        file_size = output_file.stat().st_size / 1024 / 1024
-        print(f"  ✓ Saved {filename} ({file_size:.1f} MB)")
+        write_layer(gdf_simplified, OUTPUT_DIR, filename, id_field='ZCTA')
         
         # Create a smaller regional sample for testing (e.g., Florida ZIPs)
         if version_name == "simplified":
@@ -113,17 +93,8 @@ def process_complete_zctas():
                 (gdf_simplified['ZCTA'].str.startswith('34'))
             ]
             
-            fl_geojson = json.loads(florida_zips.to_json())
-            for feature in fl_geojson['features']:
-                if 'ZCTA' in feature['properties']:
-                    feature['id'] = feature['properties']['ZCTA']
-            
-            fl_output = OUTPUT_DIR / "florida_zctas.json"
-            with open(fl_output, 'w') as f:
-                json.dump(fl_geojson, f, separators=(',', ':'))
-            
-            fl_size = fl_output.stat().st_size / 1024
-            print(f"  ✓ Saved florida_zctas.json ({fl_size:.1f} KB) - {len(florida_zips)} ZIPs")
+            write_layer(florida_zips, OUTPUT_DIR, "florida_zctas.json", id_field='ZCTA')
+            print(f"  ✓ {len(florida_zips)} Florida ZIPs")
 
 def create_metadata():
     """Create metadata file for complete boundaries."""
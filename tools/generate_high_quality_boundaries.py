@@ -10,6 +10,8 @@ import geopandas as gpd
 from pathlib import Path
 import zipfile
 
+from boundary_output import simplify_geometry, write_layer
+
 # Use existing downloaded data
 DATA_DIR = Path.home() / "data" / "tiger" / "GENZ"
 OUTPUT_DIR = Path(__file__).parent.parent / "docs" / "boundaries_hq"
@@ -29,15 +31,6 @@ def load_from_local(file_pattern):
             return gpd.read_file(file_path)
     return None
 
-def simplify_geometry(gdf, tolerance=0.01):
-    """Minimal simplification to preserve quality while reducing file size slightly."""
-    # Project to Web Mercator for simplification
-    gdf_projected = gdf.to_crs('EPSG:3857')
-    # MUCH less aggressive simplification for quality
-    gdf_projected['geometry'] = gdf_projected.geometry.simplify(tolerance=tolerance)
-    # Project back to WGS84
-    return gdf_projected.to_crs('EPSG:4326')
-
 def process_us_states():
     """Process US state boundaries with HIGH QUALITY."""
     print("\n=== Processing US States (High Quality) ===")
@@ -71,24 +64,8 @@ def process_us_states():
     gdf = gdf[cols_to_keep]
     gdf.columns = ['FIPS', 'ABBR', 'NAME', 'geometry'] if len(cols_to_keep) == 4 else gdf.columns
     
-    # Convert to GeoJSON with higher precision
-    geojson = json.loads(gdf.to_json(ensure_ascii=False))
-    
-    # Add properties for easy access
-    for i, feature in enumerate(geojson['features']):
-        if 'FIPS' in feature['properties']:
-            feature['id'] = feature['properties']['FIPS']
-    
-    # Save to file (not minified for better debugging)
-    output_file = OUTPUT_DIR / "us_states_hq.json"
-    with open(output_file, 'w') as f:
-        json.dump(geojson, f, separators=(',', ':'))
-    
-    file_size = output_file.stat().st_size / 1024
-    if file_size > 1024:
-        print(f"  Saved us_states_hq.json ({file_size/1024:.1f} MB) - HIGH QUALITY")
-    else:
-        print(f"  Saved us_states_hq.json ({file_size:.1f} KB) - HIGH QUALITY")
+    # Save GeoJSON (+ TopoJSON) with feature ids for easy access
+    write_layer(gdf, OUTPUT_DIR, "us_states_hq.json", id_field='FIPS')
     return gdf
 
 def process_us_counties():
@@ -116,22 +93,8 @@ def process_us_counties():
         gdf['GEOID'] = gdf['STATEFP'] + gdf['COUNTYFP']
         gdf = gdf[['GEOID', 'STATEFP', 'NAME', 'geometry'] if 'NAME' in gdf.columns else ['GEOID', 'STATEFP', 'geometry']]
     
-    # Convert to GeoJSON
-    geojson = json.loads(gdf.to_json(ensure_ascii=False))
-    for feature in geojson['features']:
-        if 'GEOID' in feature['properties']:
-            feature['id'] = feature['properties']['GEOID']
-    
-    output_file = OUTPUT_DIR / "us_counties_hq.json"
-    with open(output_file, 'w') as f:
-        json.dump(geojson, f, separators=(',', ':'))
-    
-    file_size = output_file.stat().st_size / 1024
-    if file_size > 1024:
-        print(f"  Saved us_counties_hq.json ({file_size/1024:.1f} MB) - HIGH QUALITY")
-    else:
-        print(f"  Saved us_counties_hq.json ({file_size:.1f} KB) - HIGH QUALITY")
-    
+    write_layer(gdf, OUTPUT_DIR, "us_counties_hq.json", id_field='GEOID')
+
     return gdf
 
 def create_metadata():
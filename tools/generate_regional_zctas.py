@@ -9,6 +9,8 @@ import json
 import geopandas as gpd
 from pathlib import Path
 
+from boundary_output import simplify_geometry, write_layer
+
 # Directories
 DATA_DIR = Path.home() / "data" / "tiger" / "GENZ"
 OUTPUT_DIR = Path(__file__).parent.parent / "docs" / "boundaries_regional"
@@ -43,12 +45,6 @@ REGIONS = {
     }
 }
 
-def simplify_geometry(gdf, tolerance=0.01):
-    """Simplify geometries to reduce file size."""
-    gdf_projected = gdf.to_crs('EPSG:3857')
-    gdf_projected['geometry'] = gdf_projected.geometry.simplify(tolerance=tolerance)
-    return gdf_projected.to_crs('EPSG:4326')
-
 def process_regional_zctas():
     """Process ZIP codes by region."""
     print("\n=== Processing Regional ZIP Codes ===")
@@ -99,24 +95,8 @@ def process_regional_zctas():
         region_gdf = region_gdf[[zcta_col, 'geometry']]
         region_gdf.columns = ['ZCTA', 'geometry']
         
-        # Convert to GeoJSON
-        geojson = json.loads(region_gdf.to_json())
-        
-        # Add ID field for each feature
-        for feature in geojson['features']:
-            if 'ZCTA' in feature['properties']:
-                feature['id'] = feature['properties']['ZCTA']
-        
-        # Save to file
-        output_file = OUTPUT_DIR / f"zctas_{region_key}.json"
-        with open(output_file, 'w') as f:
-            json.dump(geojson, f, separators=(',', ':'))
-        
-        file_size = output_file.stat().st_size / 1024
-        if file_size > 1024:
-            print(f"    ✓ Saved zctas_{region_key}.json ({file_size/1024:.1f} MB)")
-        else:
-            print(f"    ✓ Saved zctas_{region_key}.json ({file_size:.1f} KB)")
+        # Save GeoJSON (+ TopoJSON) with an id per feature
+        write_layer(region_gdf, OUTPUT_DIR, f"zctas_{region_key}.json", id_field='ZCTA')
     
     # Also create individual state files for commonly used states
     print("\n  Creating individual state ZIP files...")
@@ -136,20 +116,8 @@ def process_regional_zctas():
             state_gdf = state_gdf[[zcta_col, 'geometry']]
             state_gdf.columns = ['ZCTA', 'geometry']
             
-            geojson = json.loads(state_gdf.to_json())
-            for feature in geojson['features']:
-                if 'ZCTA' in feature['properties']:
-                    feature['id'] = feature['properties']['ZCTA']
-            
-            output_file = OUTPUT_DIR / f"zctas_{state_code.lower()}.json"
-            with open(output_file, 'w') as f:
-                json.dump(geojson, f, separators=(',', ':'))
-            
-            file_size = output_file.stat().st_size / 1024
-            if file_size > 1024:
-                print(f"    ✓ {state_code}: {len(state_gdf)} ZIPs ({file_size/1024:.1f} MB)")
-            else:
-                print(f"    ✓ {state_code}: {len(state_gdf)} ZIPs ({file_size:.1f} KB)")
+            write_layer(state_gdf, OUTPUT_DIR, f"zctas_{state_code.lower()}.json", id_field='ZCTA')
+            print(f"    ✓ {state_code}: {len(state_gdf)} ZIPs")
 
 def create_metadata():
     """Create metadata file for regional boundaries."""
@@ -10,6 +10,8 @@ import geopandas as gpd
 from pathlib import Path
 import zipfile
 
+from boundary_output import simplify_geometry, write_layer
+
 # Use existing downloaded data
 DATA_DIR = Path.home() / "data" / "tiger" / "GENZ"
 OUTPUT_DIR = Path(__file__).parent.parent / "docs" / "boundaries"
@@ -29,14 +31,6 @@ def load_from_local(file_pattern):
             return gpd.read_file(file_path)
     return None
 
-def simplify_geometry(gdf, tolerance=0.01):
-    """Simplify geometries to reduce file size."""
-    # Project to Web Mercator for simplification
-    gdf_projected = gdf.to_crs('EPSG:3857')
-    gdf_projected['geometry'] = gdf_projected.geometry.simplify(tolerance=tolerance)
-    # Project back to WGS84
-    return gdf_projected.to_crs('EPSG:4326')
-
 def process_us_states():
     """Process US state boundaries."""
     print("\n=== Processing US States ===")
@@ -70,21 +64,8 @@ def process_us_states():
     gdf = gdf[cols_to_keep]
     gdf.columns = ['FIPS', 'ABBR', 'NAME', 'geometry'] if len(cols_to_keep) == 4 else gdf.columns
     
-    # Convert to GeoJSON
-    geojson = json.loads(gdf.to_json())
-    
-    # Add properties for easy access
-    for i, feature in enumerate(geojson['features']):
-        if 'FIPS' in feature['properties']:
-            feature['id'] = feature['properties']['FIPS']
-    
-    # Save to file
-    output_file = OUTPUT_DIR / "us_states.json"
-    with open(output_file, 'w') as f:
-        json.dump(geojson, f, separators=(',', ':'))  # Minify
-    
-    file_size = output_file.stat().st_size / 1024
-    print(f"  Saved us_states.json ({file_size:.1f} KB)")
+    # Save GeoJSON (+ TopoJSON) with feature ids for easy access
+    write_layer(gdf, OUTPUT_DIR, "us_states.json", id_field='FIPS')
     return gdf
 
 def process_us_counties():
@@ -125,21 +106,7 @@ def process_us_counties():
         gdf['GEOID'] = gdf['STATEFP'] + gdf['COUNTYFP']
         gdf = gdf[['GEOID', 'STATEFP', 'NAME', 'geometry'] if 'NAME' in gdf.columns else ['GEOID', 'STATEFP', 'geometry']]
     
-    # Convert to GeoJSON
-    geojson = json.loads(gdf.to_json())
-    for feature in geojson['features']:
-        if 'GEOID' in feature['properties']:
-            feature['id'] = feature['properties']['GEOID']
-    
-    output_file = OUTPUT_DIR / "us_counties.json"
-    with open(output_file, 'w') as f:
-        json.dump(geojson, f, separators=(',', ':'))
-    
-    file_size = output_file.stat().st_size / 1024
-    if file_size > 1024:
-        print(f"  Saved us_counties.json ({file_size/1024:.1f} MB)")
-    else:
-        print(f"  Saved us_counties.json ({file_size:.1f} KB)")
+    write_layer(gdf, OUTPUT_DIR, "us_counties.json", id_field='GEOID')
 
 def process_sample_zctas():
     """Process sample ZCTA (ZIP code) data for demos."""
@@ -175,18 +142,7 @@ def process_sample_zctas():
             gdf = gdf[['GEOID20', 'geometry']]
             gdf.columns = ['ZCTA', 'geometry']
         
-        # Convert to GeoJSON
-        geojson = json.loads(gdf.to_json())
-        for feature in geojson['features']:
-            if 'ZCTA' in feature['properties']:
-                feature['id'] = feature['properties']['ZCTA']
-        
-        output_file = OUTPUT_DIR / "sample_zctas.json"
-        with open(output_file, 'w') as f:
-            json.dump(geojson, f, separators=(',', ':'))
-        
-        file_size = output_file.stat().st_size / 1024
-        print(f"  Saved sample_zctas.json ({file_size:.1f} KB)")
+        write_layer(gdf, OUTPUT_DIR, "sample_zctas.json", id_field='ZCTA')
         break
 
 def create_metadata():
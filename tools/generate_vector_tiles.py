@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Build a single-file PMTiles archive of Mapbox Vector Tiles from the cached
+TIGER layers, simplified per zoom level.
+
+With tiles the browser only fetches what is on screen, so ZCTA, tract and
+block group layers can be shown nationally instead of being split into
+regional GeoJSON files. The Local Engine serves the archive at
+/tiles/<layer>.pmtiles (HTTP range requests) and /tiles/<layer>/{z}/{x}/{y}.mvt.
+
+Requires: pip install mapbox-vector-tile pmtiles
+"""
+
+import argparse
+import glob
+import gzip
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from topology import Topology, build_topology, simplify_shared
+
+try:
+    import mapbox_vector_tile
+    from pmtiles.tile import Compression, TileType, zxy_to_tileid
+    from pmtiles.writer import Writer
+except Exception:  # pragma: no cover
+    mapbox_vector_tile = None
+
+EXTENT = 4096
+# Clip features a little past the tile edge so strokes do not show seams
+BUFFER_UNITS = 64
+WORLD = 2 * math.pi * 6378137.0
+ORIGIN = WORLD / 2
+
+LAYERS = {
+    # level: (file pattern, id field candidates, default max zoom)
+    'state': ('cb_2023_us_state_500k', ['GEOID', 'STATEFP'], 8),
+    'county': ('cb_2023_us_county_500k', ['GEOID'], 10),
+    'place': ('cb_2023_us_place_500k', ['GEOID'], 12),
+    'zcta': ('cb_2020_us_zcta520_500k', ['GEOID20', 'ZCTA5CE20', 'GEOID10'], 12),
+    'subcounty': ('cb_2023_*_cousub_500k', ['GEOID'], 12),
+    'tract': ('cb_2023_*_tract_500k', ['GEOID'], 12),
+    'bg': ('cb_2023_*_bg_500k', ['GEOID'], 13),
+}
+
+
+def require_deps():
+    if mapbox_vector_tile is None:
+        raise SystemExit("Vector tiles need: pip install mapbox-vector-tile pmtiles")
+
+
+def load_layer(cache_dir: str, level: str, states: Optional[List[str]] = None) -> gpd.GeoDataFrame:
+    pattern, id_fields, _ = LAYERS[level]
+    parquet_dir = os.path.join(cache_dir, 'parquet')
+    paths = sorted(glob.glob(os.path.join(parquet_dir, pattern + '.parquet')))
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(cache_dir, pattern + '.zip')))
+    if states and '*' in pattern:
+        wanted = {f'_{s}_' for s in states}
+        paths = [p for p in paths if any(w in os.path.basename(p) for w in wanted)]
+    if not paths:
+        raise SystemExit(f"No cached files for {level} ({pattern}) in {cache_dir}")
+    frames = []
+    for p in paths:
+        print(f"  reading {os.path.basename(p)}")
+        frames.append(gpd.read_parquet(p) if p.endswith('.parquet') else gpd.read_file(f'zip://{p}'))
+    gdf = gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=frames[0].crs)
+    id_field = next((c for c in id_fields if c in gdf.columns), None)
+    keep = [c for c in [id_field, 'NAME', 'STATEFP'] if c and c in gdf.columns]
+    gdf = gdf[keep + ['geometry']]
+    if id_field and id_field != 'GEOID':
+        gdf = gdf.rename(columns={id_field: 'GEOID'})
+    return gdf
+
+
+def tile_span(z: int) -> float:
+    return WORLD / (1 << z)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    span = tile_span(z)
+    minx = -ORIGIN + x * span
+    maxy = ORIGIN - y * span
+    return minx, maxy - span, minx + span, maxy
+
+
+def tiles_for_bounds(z: int, bounds: np.ndarray) -> set:
+    """All (x, y) tiles touched by any of the (n, 4) EPSG:3857 bounds."""
+    span = tile_span(z)
+    n = 1 << z
+    x0 = np.clip(np.floor((bounds[:, 0] + ORIGIN) / span), 0, n - 1).astype(np.int64)
+    x1 = np.clip(np.floor((bounds[:, 2] + ORIGIN) / span), 0, n - 1).astype(np.int64)
+    y0 = np.clip(np.floor((ORIGIN - bounds[:, 3]) / span), 0, n - 1).astype(np.int64)
+    y1 = np.clip(np.floor((ORIGIN - bounds[:, 1]) / span), 0, n - 1).astype(np.int64)
+    tiles = set()
+    for a, b, c, d in zip(x0, x1, y0, y1):
+        for x in range(a, b + 1):
+            for y in range(c, d + 1):
+                tiles.add((x, y))
+    return tiles
+
+
+def simplify_for_zoom(geoms: np.ndarray, z: int, simplify_units: float, topo: Optional[Topology] = None) -> np.ndarray:
+    # Tolerance in tile grid units: details below it cannot be drawn at this zoom.
+    # Shared borders are simplified once so neighbouring features keep meeting exactly.
+    tol = tile_span(z) / EXTENT * simplify_units
+    out = simplify_shared(geoms, tol, topo=topo)
+    return np.where(shapely.is_missing(out) | shapely.is_empty(out), None, out)
+
+
+def encode_tile(z: int, x: int, y: int, layer: str, geoms: np.ndarray, props: List[dict],
+                tree: shapely.STRtree) -> Optional[bytes]:
+    bounds = tile_bounds(z, x, y)
+    pad = tile_span(z) / EXTENT * BUFFER_UNITS
+    clip_box = (bounds[0] - pad, bounds[1] - pad, bounds[2] + pad, bounds[3] + pad)
+    idx = tree.query(shapely.box(*clip_box), predicate='intersects')
+    if len(idx) == 0:
+        return None
+    clipped = shapely.clip_by_rect(geoms[idx], *clip_box)
+    features = [
+        {'geometry': g, 'properties': props[i]}
+        for i, g in zip(idx, clipped)
+        if g is not None and not g.is_empty and g.geom_type in ('Polygon', 'MultiPolygon')
+    ]
+    if not features:
+        return None
+    data = mapbox_vector_tile.encode(
+        [{'name': layer, 'features': features}],
+        default_options={'quantize_bounds': bounds, 'extents': EXTENT},
+    )
+    return gzip.compress(data, mtime=0)
+
+
+def build_pmtiles(gdf: gpd.GeoDataFrame, out_path: str, layer: str, min_zoom: int, max_zoom: int,
+                  simplify_units: float = 4.0) -> Dict[int, int]:
+    require_deps()
+    wgs = gdf.to_crs('EPSG:4326')
+    lon0, lat0, lon1, lat1 = wgs.total_bounds
+    merc = gdf.to_crs('EPSG:3857')
+    base_geoms = np.asarray(merc.geometry.values)
+    topo = build_topology(base_geoms)
+    props = [
+        {k: v for k, v in rec.items() if v is not None and not (isinstance(v, float) and math.isnan(v))}
+        for rec in merc.drop(columns=['geometry']).astype(object).to_dict('records')
+    ]
+    counts: Dict[int, int] = {}
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        writer = Writer(f)
+        for z in range(min_zoom, max_zoom + 1):
+            t0 = time.time()
+            geoms = simplify_for_zoom(base_geoms, z, simplify_units, topo)
+            valid = np.flatnonzero(~shapely.is_missing(geoms))
+            zgeoms = geoms[valid]
+            zprops = [props[i] for i in valid]
+            tree = shapely.STRtree(zgeoms)
+            tiles = tiles_for_bounds(z, shapely.bounds(zgeoms))
+            # Tile ids are Hilbert ordered; writing in order keeps the archive clustered
+            n = 0
+            for tid, x, y in sorted((zxy_to_tileid(z, x, y), x, y) for x, y in tiles):
+                data = encode_tile(z, x, y, layer, zgeoms, zprops, tree)
+                if data is not None:
+                    writer.write_tile(tid, data)
+                    n += 1
+            counts[z] = n
+            print(f"  z{z}: {n} tiles ({time.time() - t0:.1f}s)")
+        header = {
+            'tile_type': TileType.MVT,
+            'tile_compression': Compression.GZIP,
+            'min_lon_e7': int(lon0 * 1e7),
+            'min_lat_e7': int(lat0 * 1e7),
+            'max_lon_e7': int(lon1 * 1e7),
+            'max_lat_e7': int(lat1 * 1e7),
+            'center_zoom': min_zoom,
+            'center_lon_e7': int((lon0 + lon1) / 2 * 1e7),
+            'center_lat_e7': int((lat0 + lat1) / 2 * 1e7),
+        }
+        fields = {c: 'String' for c in gdf.columns if c != 'geometry'}
+        metadata = {
+            'name': layer,
+            'vector_layers': [{'id': layer, 'fields': fields, 'minzoom': min_zoom, 'maxzoom': max_zoom}],
+        }
+        writer.finalize(header, metadata)
+    os.replace(tmp_path, out_path)
+    return counts
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description="Build a PMTiles vector tile archive from cached TIGER layers")
+    ap.add_argument('--cache-dir', required=True, help='Cache directory with TIGER ZIPs (and parquet/)')
+    ap.add_argument('--level', required=True, choices=list(LAYERS), help='Geography level to tile')
+    ap.add_argument('--out', help='Output .pmtiles path (default <cache>/tiles/<level>.pmtiles)')
+    ap.add_argument('--states', help='Comma-separated FIPS to limit per-state layers (tract, bg, subcounty)')
+    ap.add_argument('--min-zoom', type=int, default=0, help='Lowest zoom level (default 0)')
+    ap.add_argument('--max-zoom', type=int, help='Highest zoom level (default depends on level)')
+    ap.add_argument('--simplify', type=float, default=4.0, help='Simplification tolerance in tile units of a 4096 grid (default 4)')
+    return ap.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    require_deps()
+    max_zoom = args.max_zoom if args.max_zoom is not None else LAYERS[args.level][2]
+    out = args.out or os.path.join(args.cache_dir, 'tiles', f'{args.level}.pmtiles')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    states = [s.strip() for s in args.states.split(',')] if args.states else None
+    print(f"Tiling {args.level} z{args.min_zoom}-{max_zoom} -> {out}")
+    gdf = load_layer(args.cache_dir, args.level, states)
+    print(f"  {len(gdf)} features")
+    counts = build_pmtiles(gdf, out, args.level, args.min_zoom, max_zoom, args.simplify)
+    size_mb = os.path.getsize(out) / 1024 / 1024
+    print(f"Done. {sum(counts.values())} tiles, {size_mb:.1f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
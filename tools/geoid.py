@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+GEOID/ZIP key normalization shared by choropleth.py and the local engine.
+
+CSV keys arrive as integers (leading zeros lost), floats (``12001.0``),
+ZIP+4 (``32801-1234``), Census GEO_IDs (``0500000US12001``) or padded
+strings. ``normalize_geoids`` turns any of these into fixed-width digit
+strings in one pass over the Arrow string buffer (no regex, no per-row
+Python), and flags the rows it could not parse.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except Exception:  # pragma: no cover
+    pa = None
+    pc = None
+
+GEOID_WIDTHS = {
+    'state': 2,
+    'county': 5,
+    'place': 7,
+    'subcounty': 10,
+    'tract': 11,
+    'bg': 12,
+    'zcta': 5,
+}
+
+
+def _as_string_array(values) -> 'pa.Array':
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        arr = values
+    else:
+        try:
+            arr = pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            # Mixed object column (ints and strings): compare as text
+            s = pd.Series(values, dtype=object)
+            arr = pa.array(s.where(s.isna(), s.astype(str)), type=pa.string(), from_pandas=True)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    if pa.types.is_floating(arr.type):
+        # Only whole numbers are keys (12001.0); 12001.5 is not
+        whole = pc.and_(pc.is_finite(arr), pc.equal(pc.floor(arr), arr))
+        arr = pc.if_else(whole, arr, pa.scalar(None, arr.type)).cast(pa.int64())
+    if pa.types.is_integer(arr.type):
+        arr = pc.if_else(pc.less(arr, 0), pa.scalar(None, arr.type), arr)
+    if pa.types.is_dictionary(arr.type):
+        arr = arr.dictionary_decode()
+    if not pa.types.is_large_string(arr.type):
+        arr = arr.cast(pa.large_string())
+    return arr
+
+
+def _digit_matrix(values, width: int, truncate: bool) -> Tuple[np.ndarray, np.ndarray]:
+    # (n, width) uint8 ASCII digits, right-aligned and zero-padded, and the parsed-row mask
+    arr = _as_string_array(values)
+    n = len(arr)
+    offsets = np.frombuffer(arr.buffers()[1], dtype=np.int64)[arr.offset:arr.offset + n + 1]
+    data = arr.buffers()[2]
+    raw = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+    starts, ends = offsets[:-1], offsets[1:]
+    valid = ~np.asarray(arr.is_null(), dtype=bool)
+
+    # Census GEO_IDs: digits before 'US' are the summary level, not the key
+    us = pc.find_substring(arr, 'US').to_numpy(zero_copy_only=False)
+    us = np.where(np.isnan(us.astype(float)), -1, us).astype(np.int64)
+    search_from = np.where(us >= 0, starts + us + 2, starts)
+
+    is_digit = (raw >= 48) & (raw <= 57)
+    digit_pos = np.flatnonzero(is_digit)
+    other_pos = np.append(np.flatnonzero(~is_digit), len(raw))
+    first = digit_pos[np.minimum(np.searchsorted(digit_pos, search_from), max(len(digit_pos) - 1, 0))] if len(digit_pos) else starts
+    has_digit = valid & (len(digit_pos) > 0) & (first >= search_from) & (first < ends)
+    run_start = np.where(has_digit, first, 0)
+    run_end = np.minimum(other_pos[np.searchsorted(other_pos, run_start)], ends)
+    length = np.where(has_digit, run_end - run_start, 0)
+
+    too_long = length > width
+    if truncate:
+        length = np.minimum(length, width)
+        too_long[:] = False
+    ok = has_digit & ~too_long
+    length = np.where(ok, length, 0)
+
+    # Right-align each run in a width-wide row of '0's, one column at a time
+    run_end = run_start + length
+    out = np.full((n, width), ord('0'), dtype=np.uint8)
+    for col in range(width):
+        src = run_end - (width - col)
+        take = src >= run_start
+        out[take, col] = raw[src[take]]
+    return out, ok
+
+
+def normalize_geoids(values, width: int, truncate: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ``width``-digit key strings for ``values`` (Series, ndarray, list or Arrow
+    array) and a boolean mask of rows that could not be parsed; those get ''.
+
+    The key is the first run of digits (after ``US`` in a Census GEO_ID),
+    left-padded with zeros. Runs longer than ``width`` are invalid unless
+    ``truncate`` (ZIP+4 written without the dash: ``328011234`` -> ``32801``).
+    """
+    if pa is None:
+        return _normalize_python(values, width, truncate)
+    out, ok = _digit_matrix(values, width, truncate)
+    n = len(out)
+    keys = pa.StringArray.from_buffers(
+        n, pa.py_buffer(np.arange(0, (n + 1) * width, width, dtype=np.int32)), pa.py_buffer(out),
+    ).to_numpy(zero_copy_only=False)
+    keys[~ok] = ''
+    return keys, ~ok
+
+
+def _direct_codes(values, width: int, truncate: bool = False) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    # Integer columns, and string columns that are all exactly ``width`` digits
+    # (boundary GEOIDs), convert without the digit scan; None otherwise
+    arr = _as_string_array(values) if not isinstance(values, (pd.Series, np.ndarray)) or values.dtype.kind not in 'iuf' else None
+    if arr is None:
+        num = pd.Series(values).to_numpy(dtype=float, na_value=np.nan)
+        if truncate and (num >= 10 ** width).any():
+            # Numbers wider than the key (ZIP+4 as 328011234) are cut by the digit scan
+            return None
+        bad = ~np.isfinite(num) | (num < 0) | (num >= 10 ** width) | (np.floor(num) != num)
+        codes = np.where(bad, -1, np.nan_to_num(num, nan=-1)).astype(np.int64)
+        return codes, bad
+    if arr.null_count or not len(arr):
+        return None
+    lengths = pc.binary_length(arr)
+    if pc.min_max(lengths)['min'].as_py() != width or pc.min_max(lengths)['max'].as_py() != width:
+        return None
+    try:
+        codes = pc.cast(arr, pa.int64()).to_numpy()
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return None
+    if (codes < 0).any():
+        return None
+    return codes, np.zeros(len(codes), dtype=bool)
+
+
+def geoid_codes(values, width: int, truncate: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keys as int64 (the GEOID read as a number; width <= 18) with -1 for rows
+    that could not be parsed, plus that mask. Same rules as ``normalize_geoids``;
+    comparing codes is a join on integers instead of Python strings.
+    """
+    if pa is None:
+        keys, bad = _normalize_python(values, width, truncate)
+        return np.array([int(k) if k else -1 for k in keys], dtype=np.int64), bad
+    fast = _direct_codes(values, width, truncate)
+    if fast is not None:
+        return fast
+    out, ok = _digit_matrix(values, width, truncate)
+    codes = np.zeros(len(out), dtype=np.int64)
+    for col in range(width):
+        codes = codes * 10 + (out[:, col] - ord('0'))
+    codes[~ok] = -1
+    return codes, ~ok
+
+
+def _normalize_python(values, width: int, truncate: bool) -> Tuple[np.ndarray, np.ndarray]:
+    # Without pyarrow: same rules, one row at a time
+    keys = []
+    for v in pd.Series(values, dtype=object):
+        if v is None or (isinstance(v, float) and (not np.isfinite(v) or v != int(v))):
+            keys.append('')
+            continue
+        s = str(int(v)) if isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool) else str(v)
+        if 'US' in s:
+            s = s[s.index('US') + 2:]
+        i = next((k for k, ch in enumerate(s) if ch.isascii() and ch.isdigit()), None)
+        if i is None:
+            keys.append('')
+            continue
+        j = i
+        while j < len(s) and s[j].isascii() and s[j].isdigit():
+            j += 1
+        run = s[i:j][:width] if truncate else s[i:j]
+        keys.append(run.zfill(width) if len(run) <= width else '')
+    keys = np.array(keys, dtype=object)
+    return keys, keys == ''
+
+
+def normalize_level_keys(level: str, values) -> Tuple[np.ndarray, np.ndarray]:
+    """``normalize_geoids`` with the GEOID width for ``level``; ZIP+4 is cut to the ZIP."""
+    return normalize_geoids(values, GEOID_WIDTHS[level], truncate=(level == 'zcta'))
+
+
+def level_codes(level: str, values) -> Tuple[np.ndarray, np.ndarray]:
+    return geoid_codes(values, GEOID_WIDTHS[level], truncate=(level == 'zcta'))
+
+
+def index_join(left, right: pd.DataFrame, left_codes: np.ndarray, right_codes: np.ndarray,
+               on: Tuple[str, ...] = (), suffixes: Tuple[str, str] = ('_x', '_y')):
+    """
+    ``left.merge(right, how='left')`` on integer key codes, as an index lookup.
+
+    Each ``left`` row takes the first ``right`` row with the same code (codes
+    < 0 never match); ``on`` names key columns of ``right`` that are dropped,
+    and other shared column names get ``suffixes`` like merge. The attribute
+    columns are gathered with one reindex; a GeoDataFrame's geometry array is
+    reattached last, as-is, rather than shuffled through the merge.
+    """
+    right = right.drop(columns=[c for c in on if c in right.columns])
+    valid = right_codes >= 0
+    codes = pd.Index(right_codes[valid])
+    first = ~codes.duplicated()
+    rows = pd.Index(codes[first]).get_indexer(left_codes)
+    rows[left_codes < 0] = -1
+    picked = right.loc[valid].loc[first].reset_index(drop=True).reindex(rows).reset_index(drop=True)
+
+    geom_col = left.geometry.name if hasattr(left, 'geometry') and hasattr(left, 'crs') else None
+    props = left.drop(columns=[geom_col]) if geom_col else left
+    shared = set(props.columns) & set(picked.columns)
+    props = props.rename(columns={c: c + suffixes[0] for c in shared}).reset_index(drop=True)
+    picked = picked.rename(columns={c: c + suffixes[1] for c in shared})
+    out = pd.concat([props, picked], axis=1)
+    if geom_col is None:
+        return out
+    import geopandas as gpd
+    out[geom_col] = left[geom_col].values
+    return gpd.GeoDataFrame(out, geometry=geom_col, crs=left.crs)
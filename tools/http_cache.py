@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+HTTP caching helpers for the local engine.
+
+Boundary responses only change when the TIGER cache does, so they get an
+ETag derived from the request and the files behind it, are revalidated
+with If-None-Match (304), and are kept on disk already gzip/brotli
+compressed so a repeat load is a file send with no encoding work.
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import brotli
+except Exception:  # pragma: no cover
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+
+def make_etag(*parts) -> str:
+    # Weak: the same ETag covers the identity, gzip and brotli encodings of a body
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith('W/') else tag) == opaque:
+            return True
+    return False
+
+
+def cache_control(max_age: int = 0) -> str:
+    # no-cache still stores the body, but revalidates (cheap 304) before each use
+    return f'public, max-age={max_age}' if max_age > 0 else 'no-cache'
+
+
+def pick_encoding(accept_encoding: Optional[str], offered: Tuple[str, ...] = ('br', 'gzip')) -> Optional[str]:
+    accepted = {}
+    for item in (accept_encoding or '').lower().split(','):
+        name, _, params = item.strip().partition(';')
+        m = re.search(r'q=([0-9.]+)', params)
+        accepted[name.strip()] = float(m.group(1)) if m else 1.0
+    for name in offered:
+        if name == 'br' and brotli is None:
+            continue
+        if accepted.get(name, 0) > 0:
+            return name
+    return None
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> bytes:
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as gz:
+        for chunk in chunks:
+            gz.write(chunk)
+    return buf.getvalue()
+
+
+def write_compressed(path: str, encoding: str, chunks: Iterable[bytes]) -> str:
+    """Compress ``chunks`` into ``path`` as they are produced (tmp file, then rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as raw:
+        if encoding == 'br':
+            comp = brotli.Compressor(quality=BROTLI_QUALITY)
+            for chunk in chunks:
+                raw.write(comp.process(chunk))
+            raw.write(comp.finish())
+        else:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                for chunk in chunks:
+                    gz.write(chunk)
+    os.replace(tmp, path)
+    return path
+
+
+class ResponseStore:
+    """
+    Compressed response bodies under ``root``, one file per (ETag, encoding):
+    ``<etag>.<lod>.<encoding>``. Files are written by ``write_compressed``
+    (possibly in a worker process) and registered with ``add``; the least
+    recently served are removed once the total exceeds ``budget_bytes``.
+    """
+
+    def __init__(self, root: str, budget_bytes: int):
+        self.root = root
+        self.budget_bytes = int(budget_bytes)
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[Tuple[str, str], Tuple[str, Optional[int], int]]] = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _stem(etag: str) -> str:
+        return re.sub(r'[^0-9a-f]', '', etag)
+
+    def path_for(self, etag: str, encoding: str, lod: Optional[int]) -> str:
+        return os.path.join(self.root, f"{self._stem(etag)}.{lod or 'full'}.{encoding}")
+
+    def _scan(self) -> None:
+        # Bodies from a previous run are reused; access order restarts from file mtime
+        self._index = {}
+        self.bytes = 0
+        try:
+            names = sorted(os.listdir(self.root), key=lambda n: os.path.getmtime(os.path.join(self.root, n)))
+        except OSError:
+            return
+        for name in names:
+            parts = name.split('.')
+            path = os.path.join(self.root, name)
+            if len(parts) != 3:
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                continue
+            size = os.path.getsize(path)
+            lod = int(parts[1]) if parts[1].isdigit() else None
+            self._index[(parts[0], parts[2])] = (path, lod, size)
+            self.bytes += size
+
+    def find(self, etag: str, encoding: str) -> Optional[Tuple[str, Optional[int]]]:
+        """(path, lod) of a stored body, if any."""
+        key = (self._stem(etag), encoding)
+        with self._lock:
+            if self._index is None:
+                self._scan()
+            entry = self._index.pop(key, None)
+            if entry is not None and os.path.exists(entry[0]):
+                self._index[key] = entry  # most recently used last
+                self.hits += 1
+                return entry[0], entry[1]
+            if entry is not None:
+                self.bytes -= entry[2]
+            self.misses += 1
+            return None
+
+    def add(self, etag: str, encoding: str, lod: Optional[int], path: str) -> None:
+        key = (self._stem(etag), encoding)
+        size = os.path.getsize(path)
+        with self._lock:
+            if self._index is None:
+                self._scan()
+            old = self._index.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._index[key] = (path, lod, size)
+            self.bytes += size
+            while self.bytes > self.budget_bytes and len(self._index) > 1:
+                oldest = next(iter(self._index))
+                old_path, _, old_size = self._index.pop(oldest)
+                self.bytes -= old_size
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._index or {}),
+                'bytes': self.bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
-import io
+import functools
+import glob
+import json
+import multiprocessing
 import os
-from typing import Optional, Tuple
+import re
+import threading
+import time
+import zlib
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
-from fastapi import FastAPI, File, Form, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, Query, Request, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse, FileResponse
+from fastapi.responses import RedirectResponse, FileResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 
 try:
@@ -14,6 +24,31 @@ try:
 except Exception as e:  # pragma: no cover
     gpd = None
 
+try:
+    from tools.arrow_store import BoundaryStore, store_path
+    from tools.boundary_cache import BoundaryCache
+    from tools.worker_pool import Coalescer, PoolBusy, WorkerPool
+    from tools.boundary_formats import ATTRIBUTE_MEDIA_TYPES, FORMATS, MEDIA_TYPES, encode, encode_attributes
+    from tools.http_cache import ResponseStore, cache_control, etag_matches, gzip_chunks, make_etag, pick_encoding, write_compressed
+    from tools.result_cache import ResultCache, content_key
+    from tools.lod import LOD_TOLERANCES, METRES_PER_DEGREE, lod_name, pick_lod, tolerance_for_zoom
+    from tools.csv_ingest import KEY_CANDIDATES, Spool, find_key_column, read_csv, read_header
+    from tools.geoid import index_join, level_codes
+    from tools.metrics import add_metrics
+    from tools.zcta_index import REGIONS, index_path, zcta_key_column
+except ImportError:  # pragma: no cover - run as a script from tools/
+    from arrow_store import BoundaryStore, store_path
+    from boundary_cache import BoundaryCache
+    from worker_pool import Coalescer, PoolBusy, WorkerPool
+    from boundary_formats import ATTRIBUTE_MEDIA_TYPES, FORMATS, MEDIA_TYPES, encode, encode_attributes
+    from http_cache import ResponseStore, cache_control, etag_matches, gzip_chunks, make_etag, pick_encoding, write_compressed
+    from result_cache import ResultCache, content_key
+    from lod import LOD_TOLERANCES, METRES_PER_DEGREE, lod_name, pick_lod, tolerance_for_zoom
+    from csv_ingest import KEY_CANDIDATES, Spool, find_key_column, read_csv, read_header
+    from geoid import index_join, level_codes
+    from metrics import add_metrics
+    from zcta_index import REGIONS, index_path, zcta_key_column
+
 STATE_ABBR_TO_FIPS = {
     'AL': '01','AK': '02','AZ': '04','AR': '05','CA': '06','CO': '08','CT': '09','DE': '10','DC': '11',
     'FL': '12','GA': '13','HI': '15','ID': '16','IL': '17','IN': '18','IA': '19','KS': '20','KY': '21',
@@ -24,8 +59,11 @@ STATE_ABBR_TO_FIPS = {
     'PR': '72','VI': '78','UM': '74'
 }
 
+
 CACHE_DIR = os.environ.get('CHOROPLETH_CACHE_DIR', os.path.expanduser('~/data/tiger/GENZ'))
 PARQUET_DIR = os.path.join(CACHE_DIR, 'parquet')
+PARTITIONED_DIR = os.path.join(PARQUET_DIR, 'partitioned')
+TILES_DIR = os.path.join(CACHE_DIR, 'tiles')
 try:
     import pyarrow  # noqa: F401
     _HAS_ARROW = True
@@ -34,6 +72,35 @@ except Exception:
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DOCS_DIR = os.path.normpath(os.path.join(BASE_DIR, '..', 'docs'))
 
+# Decoded layers stay in memory across requests; budget in MB (LRU eviction beyond it)
+BOUNDARY_CACHE_MB = float(os.environ.get('CHOROPLETH_BOUNDARY_CACHE_MB', '1024'))
+BOUNDARY_CACHE = BoundaryCache(int(BOUNDARY_CACHE_MB * 1024 * 1024))
+
+# National layers loaded in the background at startup (CHOROPLETH_WARMUP=0 disables)
+WARMUP_ENABLED = os.environ.get('CHOROPLETH_WARMUP', '1') != '0'
+WARM_LAYERS = [l.strip() for l in os.environ.get('CHOROPLETH_WARM_LAYERS', 'state,county,place,zcta').split(',') if l.strip()]
+
+# Blocking load/join work runs in a pool, off the event loop. 'process' mode sidesteps
+# the GIL, but each worker process keeps (and warms) its own boundary cache.
+WORKER_MODE = os.environ.get('CHOROPLETH_WORKER_MODE', 'thread')
+WORKERS = int(os.environ.get('CHOROPLETH_WORKERS', str(min(4, os.cpu_count() or 1))))
+MAX_CONCURRENT = int(os.environ.get('CHOROPLETH_MAX_CONCURRENT', str(WORKERS)))
+MAX_QUEUE = int(os.environ.get('CHOROPLETH_MAX_QUEUE', '64'))
+
+# Boundary responses carry an ETag and are kept gzip/brotli-compressed on disk
+# (budget in MB). Browsers revalidate every time unless a max-age is set.
+BOUNDARY_MAX_AGE = int(os.environ.get('CHOROPLETH_BOUNDARY_MAX_AGE', '0'))
+RESPONSE_CACHE_MB = float(os.environ.get('CHOROPLETH_RESPONSE_CACHE_MB', '512'))
+RESPONSE_STORE = ResponseStore(os.path.join(CACHE_DIR, 'responses'), int(RESPONSE_CACHE_MB * 1024 * 1024))
+# Uploads are copied to a temp file in chunks of this many bytes
+UPLOAD_CHUNK = 1 << 20
+# Finished /join bodies (gzip) by CSV hash and options: memory LRU, written through to disk
+JOIN_CACHE_MB = float(os.environ.get('CHOROPLETH_JOIN_CACHE_MB', '256'))
+JOIN_CACHE_DISK_MB = float(os.environ.get('CHOROPLETH_JOIN_CACHE_DISK_MB', '1024'))
+JOIN_CACHE = ResultCache(os.path.join(CACHE_DIR, 'join_cache'), int(JOIN_CACHE_MB * 1024 * 1024), int(JOIN_CACHE_DISK_MB * 1024 * 1024))
+# Bump when the encoded output changes for the same input files
+RESPONSE_VERSION = 4
+
 
 def require_geopandas():
     if gpd is None:
@@ -70,23 +137,276 @@ def parquet_or_zip(path_parquet: str, path_zip: str) -> str:
     return path_zip
 
 
-def load_boundary(level: str, state_abbr: str, state_fips: str) -> 'gpd.GeoDataFrame':
+LAYER_BASES = {
+    'state': 'cb_2023_us_state_500k',
+    'county': 'cb_2023_us_county_500k',
+    'place': 'cb_2023_us_place_500k',
+    'zcta': 'cb_2020_us_zcta520_500k',
+    'subcounty': 'cb_2023_{fips}_cousub_500k',
+    'tract': 'cb_2023_{fips}_tract_500k',
+    'bg': 'cb_2023_{fips}_bg_500k',
+}
+
+
+def layer_base(level: str, state_fips: str) -> str:
+    if level not in LAYER_BASES:
+        raise HTTPException(status_code=400, detail=f'unsupported level {level}')
+    return LAYER_BASES[level].format(fips=state_fips)
+
+
+def layer_path(base: str, lod: Optional[int] = None) -> str:
+    # Precomputed level of detail if it was written, else the full-resolution layer
+    if lod and _HAS_ARROW:
+        p = os.path.join(PARQUET_DIR, lod_name(base, lod) + '.parquet')
+        if os.path.exists(p):
+            return p
+    return parquet_or_zip(
+        os.path.join(PARQUET_DIR, f'{base}.parquet'),
+        os.path.join(CACHE_DIR, f'{base}.zip'),
+    )
+
+
+def select_lod(base: str, tolerance_m: Optional[float]) -> Optional[int]:
+    if not _HAS_ARROW:
+        return None
+    available = [t for t in LOD_TOLERANCES if os.path.exists(os.path.join(PARQUET_DIR, lod_name(base, t) + '.parquet'))]
+    return pick_lod(tolerance_m, available)
+
+
+# Attributes sent by default per level: keys plus the names the web app labels features with.
+# `fields=` picks others (`fields=all` for every TIGER column).
+DEFAULT_FIELDS = {
+    'state': ('GEOID', 'STATEFP', 'STUSPS', 'NAME'),
+    'county': ('GEOID', 'STATEFP', 'COUNTYFP', 'NAME', 'NAMELSAD'),
+    'place': ('GEOID', 'STATEFP', 'NAME', 'NAMELSAD'),
+    'zcta': ('GEOID20', 'ZCTA5CE20', 'GEOID10', 'ZCTA5CE10'),
+    'subcounty': ('GEOID', 'STATEFP', 'COUNTYFP', 'NAME', 'NAMELSAD'),
+    'tract': ('GEOID', 'STATEFP', 'COUNTYFP', 'NAME', 'NAMELSAD'),
+    'bg': ('GEOID', 'STATEFP', 'COUNTYFP', 'NAME', 'NAMELSAD'),
+}
+# Always read: join keys and the columns load_boundary filters on
+REQUIRED_FIELDS = {
+    'state': ('GEOID', 'STATEFP', 'STUSPS'),
+    'county': ('GEOID', 'STATEFP'),
+    'place': ('GEOID', 'STATEFP'),
+    'zcta': ('GEOID20', 'GEOID10', 'ZCTA5CE20', 'ZCTA5CE10'),
+    'subcounty': ('GEOID',),
+    'tract': ('GEOID',),
+    'bg': ('GEOID',),
+}
+
+
+def layer_columns(level: str, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Columns to read for ``fields`` (comma-separated; default per level, 'all' for everything)."""
+    if fields and fields.strip().lower() in ('all', '*'):
+        return None
+    requested = [f.strip() for f in fields.split(',') if f.strip()] if fields else DEFAULT_FIELDS.get(level, ())
+    return tuple(dict.fromkeys([*REQUIRED_FIELDS.get(level, ()), *requested]))
+
+
+def existing_columns(path: str, columns: Tuple[str, ...], extra: Tuple[str, ...] = ()) -> Tuple[str, ...]:
+    # The requested columns this parquet file (or ``extra``, e.g. partition keys) has, plus its geometry column
+    names, geo = _parquet_schema(path, os.stat(path).st_mtime_ns)
+    return tuple(c for c in columns if (c in names or c in extra) and c != geo) + (geo,)
+
+
+@functools.lru_cache(maxsize=256)
+def _parquet_schema(path: str, version: int) -> Tuple[Tuple[str, ...], str]:
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(path)
+    geo = json.loads((schema.metadata or {}).get(b'geo', b'{}')).get('primary_column', 'geometry')
+    return tuple(schema.names), geo
+
+
+def select_columns(gdf: 'gpd.GeoDataFrame', columns: Optional[Tuple[str, ...]]) -> 'gpd.GeoDataFrame':
+    if columns is None:
+        return gdf
+    geo = gdf.geometry.name
+    return gdf[[c for c in columns if c in gdf.columns and c != geo] + [geo]]
+
+
+def read_layer(path: str, columns: Optional[Tuple[str, ...]] = None) -> 'gpd.GeoDataFrame':
+    # Cached by (file, mtime): a refreshed TIGER/parquet file invalidates its entry.
+    # Callers must treat the returned frame as read-only.
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f'no cached layer {os.path.basename(path)}')
+    version = os.stat(path).st_mtime_ns
+    if columns is not None:
+        full = cached_layer(path)
+        if full is not None or not path.endswith('.parquet'):
+            # Project the full layer already in memory (or a zip, which reads whole anyway)
+            return select_columns(full if full is not None else read_layer(path), columns)
+        # Only these columns are decoded from the parquet
+        cols = existing_columns(path, columns)
+        return BOUNDARY_CACHE.get_or_load(('layer', path, cols), version, lambda: gpd.read_parquet(path, columns=list(cols)))
+    return BOUNDARY_CACHE.get_or_load(
+        ('layer', path), version,
+        lambda: gpd.read_parquet(path) if path.endswith('.parquet') else gpd.read_file(f'zip://{path}'),
+    )
+
+
+def cached_layer(path: str, columns: Optional[Tuple[str, ...]] = None) -> Optional['gpd.GeoDataFrame']:
+    # The layer if it is already in memory (e.g. from warm-up); never loads
+    try:
+        version = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    full = BOUNDARY_CACHE.get(('layer', path), version)
+    if full is not None or columns is None:
+        return select_columns(full, columns) if full is not None else None
+    if not path.endswith('.parquet'):
+        return None
+    return BOUNDARY_CACHE.get(('layer', path, existing_columns(path, columns)), version)
+
+
+def partitioned_root(base: str, lod: Optional[int] = None) -> Optional[str]:
+    # Per-state Hive dataset written by convert_cache_to_parquet.py, if present
+    root = os.path.join(PARTITIONED_DIR, lod_name(base, lod) if lod else base)
+    if _HAS_ARROW and os.path.isdir(root):
+        return root
+    return None
+
+
+def _state_partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    # Explicit string type: inferred hive partitions would turn '01' into 1
+    return ds.partitioning(pa.schema([('STATEFP', pa.string())]), flavor='hive')
+
+
+def read_partitions(root: str, state_fips: List[str], columns: Optional[Tuple[str, ...]] = None) -> 'gpd.GeoDataFrame':
+    # Only the STATEFP=<fips> directories matching the filter are opened (and only `columns` decoded)
+    fips = tuple(sorted(state_fips))
+    parts = [os.path.join(root, f'STATEFP={f}', 'part-0.parquet') for f in fips]
+    version = tuple(os.stat(p).st_mtime_ns if os.path.exists(p) else 0 for p in parts)
+    present = [p for p in parts if os.path.exists(p)]
+    if columns is not None and present:
+        columns = existing_columns(present[0], columns, extra=('STATEFP',))
+    return BOUNDARY_CACHE.get_or_load(
+        ('partitions', root, fips, columns), version,
+        lambda: gpd.read_parquet(root, columns=list(columns) if columns else None,
+                                 filters=[('STATEFP', 'in', list(fips))], partitioning=_state_partitioning()),
+    )
+
+
+def boundary_store(base: str, lod: Optional[int] = None) -> Optional[BoundaryStore]:
+    # Memory-mapped Arrow copy of a national layer (convert_cache_to_parquet.py), if present
+    path = store_path(PARQUET_DIR, lod_name(base, lod) if lod else base)
+    if not _HAS_ARROW or not os.path.exists(path):
+        return None
+    return BOUNDARY_CACHE.get_or_load(('store', path), os.stat(path).st_mtime_ns, lambda: BoundaryStore(path))
+
+
+def read_store(store: BoundaryStore, state_fips: Optional[List[str]],
+               columns: Optional[Tuple[str, ...]] = None) -> 'gpd.GeoDataFrame':
+    # Only the selected states' rows are decoded; the national table stays in the shared mapping
+    if state_fips is None:
+        # A US-wide decode is the whole layer: caching it would put a private copy of the
+        # national layer in every worker, which is what the shared store avoids
+        return store.read(None, columns)
+    fips = tuple(sorted(state_fips))
+    return BOUNDARY_CACHE.get_or_load(
+        ('store_rows', store.path, fips, columns), os.stat(store.path).st_mtime_ns,
+        lambda: store.read(fips, columns),
+    )
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    # minx,miny,maxx,maxy in lon/lat (TIGER's NAD83 is within a metre of WGS84)
+    try:
+        minx, miny, maxx, maxy = (float(v) for v in value.split(','))
+    except ValueError:
+        raise HTTPException(status_code=400, detail='bbox must be minx,miny,maxx,maxy')
+    if minx > maxx or miny > maxy:
+        raise HTTPException(status_code=400, detail='bbox min must not exceed max')
+    return minx, miny, maxx, maxy
+
+
+def bbox_query(gdf: 'gpd.GeoDataFrame', bbox: Tuple[float, float, float, float]) -> 'gpd.GeoDataFrame':
+    import shapely
+    # geopandas keeps the STRtree on the geometry array, so a cached layer builds it once
+    idx = gdf.sindex.query(shapely.box(*bbox), predicate='intersects')
+    return gdf.iloc[np.sort(idx)]
+
+
+def read_layer_bbox(path: str, bbox: Tuple[float, float, float, float],
+                    columns: Optional[Tuple[str, ...]] = None) -> 'gpd.GeoDataFrame':
+    # A layer already in memory is searched with its STRtree; otherwise only the
+    # row groups whose bbox covering column overlaps are read from the parquet
+    if path.endswith('.parquet') and cached_layer(path, columns) is None:
+        try:
+            cols = list(existing_columns(path, columns)) if columns else None
+            return bbox_query(gpd.read_parquet(path, bbox=bbox, columns=cols), bbox)
+        except ValueError:
+            # Written without a bbox covering (older conversion)
+            pass
+    return bbox_query(read_layer(path, columns), bbox)
+
+
+def load_boundary_bbox(level: str, bbox: Tuple[float, float, float, float], tolerance_m: Optional[float] = None,
+                       columns: Optional[Tuple[str, ...]] = None) -> Tuple['gpd.GeoDataFrame', Optional[int]]:
+    """Features of ``level`` intersecting ``bbox`` anywhere in the country, and the LOD used."""
     require_geopandas()
-    
-    # Define regions
-    REGIONS = {
-        'NORTHEAST': ['CT', 'MA', 'ME', 'NH', 'NJ', 'NY', 'PA', 'RI', 'VT'],
-        'MIDWEST': ['IL', 'IN', 'IA', 'KS', 'MI', 'MN', 'MO', 'NE', 'ND', 'OH', 'SD', 'WI'],
-        'SOUTH': ['AL', 'AR', 'DE', 'FL', 'GA', 'KY', 'LA', 'MD', 'MS', 'NC', 'OK', 'SC', 'TN', 'TX', 'VA', 'WV', 'DC'],
-        'WEST': ['AZ', 'CA', 'CO', 'ID', 'MT', 'NV', 'NM', 'OR', 'UT', 'WA', 'WY', 'AK', 'HI']
-    }
-    
+    base = layer_base(level, '{fips}')
+    if '{fips}' not in base:
+        lod = select_lod(base, tolerance_m)
+        return read_layer_bbox(layer_path(base, lod), bbox, columns), lod
+    # Per-state layers: only the states the bbox touches are opened
+    states = read_layer_bbox(layer_path(LAYER_BASES['state']), bbox, ('STATEFP',))
+    frames, lods = [], []
+    for fips in sorted(states['STATEFP']):
+        state_base = layer_base(level, fips)
+        lod = select_lod(state_base, tolerance_m)
+        path = layer_path(state_base, lod)
+        if os.path.exists(path):
+            frames.append(read_layer_bbox(path, bbox, columns))
+            lods.append(lod)
+    if not frames:
+        raise HTTPException(status_code=404, detail=f'no cached {level} layers intersect the bbox')
+    gdf = gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=frames[0].crs)
+    return gdf, (lods[0] if len(set(lods)) == 1 else None)
+
+
+def _selected_fips(state_abbr: str, state_fips: str) -> List[str]:
+    if state_abbr in REGIONS:
+        return [STATE_ABBR_TO_FIPS[st] for st in REGIONS[state_abbr] if st in STATE_ABBR_TO_FIPS]
+    return [state_fips]
+
+
+def zcta_assignments(layer_path: str, gdf: 'gpd.GeoDataFrame') -> Optional[pd.DataFrame]:
+    # STUSPS/REGION per ZCTA, aligned to the cached layer, from the offline index
+    ipath = index_path(PARQUET_DIR)
+    if not os.path.exists(ipath):
+        return None
+    version = (os.stat(layer_path).st_mtime_ns, os.stat(ipath).st_mtime_ns)
+
+    def build():
+        index = pd.read_parquet(ipath, columns=['ZCTA5', 'STUSPS', 'REGION']).set_index('ZCTA5')
+        keys = gdf[zcta_key_column(gdf.columns)].astype(str).str.zfill(5)
+        return index.reindex(keys.to_numpy()).set_axis(gdf.index)
+
+    return BOUNDARY_CACHE.get_or_load(('zcta_assignments', layer_path), version, build)
+
+
+def load_boundary(level: str, state_abbr: str, state_fips: str, lod: Optional[int] = None,
+                  columns: Optional[Tuple[str, ...]] = None) -> 'gpd.GeoDataFrame':
+    # `columns` (see layer_columns) limits the attributes read; None reads them all
+    require_geopandas()
+    base = layer_base(level, state_fips)
+
+    # A warm national layer is filtered in memory; otherwise the mapped store or the state partitions
+    if level in ('county', 'place', 'zcta') and cached_layer(layer_path(base, lod), columns) is None:
+        fips = None if state_abbr == 'US' else _selected_fips(state_abbr, state_fips)
+        store = boundary_store(base, lod)
+        if store is not None:
+            return read_store(store, fips, columns)
+        root = partitioned_root(base, lod)
+        if root and fips is not None:
+            return read_partitions(root, fips, columns)
+
     if level == 'state':
-        p = parquet_or_zip(
-            os.path.join(PARQUET_DIR, 'cb_2023_us_state_500k.parquet'),
-            os.path.join(CACHE_DIR, 'cb_2023_us_state_500k.zip'),
-        )
-        gdf = gpd.read_parquet(p) if p.endswith('.parquet') else gpd.read_file(f'zip://{p}')
+        gdf = read_layer(layer_path(base, lod), columns)
         
         # Handle US, regions, or individual states
         if state_abbr == 'US':
@@ -98,87 +418,38 @@ def load_boundary(level: str, state_abbr: str, state_fips: str) -> 'gpd.GeoDataF
         else:
             # Return individual state
             return gdf[gdf['STUSPS'] == state_abbr]
-    if level == 'county':
-        p = parquet_or_zip(
-            os.path.join(PARQUET_DIR, 'cb_2023_us_county_500k.parquet'),
-            os.path.join(CACHE_DIR, 'cb_2023_us_county_500k.zip'),
-        )
-        gdf = gpd.read_parquet(p) if p.endswith('.parquet') else gpd.read_file(f'zip://{p}')
+    if level in ('county', 'place'):
+        gdf = read_layer(layer_path(base, lod), columns)
         
         if state_abbr == 'US':
-            # Return all US counties
+            # Return all US counties/places
             return gdf
         elif state_abbr in REGIONS:
-            # Get FIPS codes for states in region
-            region_fips = [STATE_ABBR_TO_FIPS[st] for st in REGIONS[state_abbr] if st in STATE_ABBR_TO_FIPS]
-            return gdf[gdf['STATEFP'].isin(region_fips)]
+            return gdf[gdf['STATEFP'].isin(_selected_fips(state_abbr, state_fips))]
         else:
             return gdf[gdf['STATEFP'] == state_fips]
-    if level == 'place':
-        p = parquet_or_zip(
-            os.path.join(PARQUET_DIR, 'cb_2023_us_place_500k.parquet'),
-            os.path.join(CACHE_DIR, 'cb_2023_us_place_500k.zip'),
-        )
-        gdf = gpd.read_parquet(p) if p.endswith('.parquet') else gpd.read_file(f'zip://{p}')
-        
-        if state_abbr == 'US':
-            # Return all US places
-            return gdf
-        elif state_abbr in REGIONS:
-            # Get places for states in region
-            region_fips = [STATE_ABBR_TO_FIPS[st] for st in REGIONS[state_abbr] if st in STATE_ABBR_TO_FIPS]
-            return gdf[gdf['STATEFP'].isin(region_fips)]
-        else:
-            return gdf[gdf['STATEFP'] == state_fips]
-    if level == 'subcounty':
-        base = f'cb_2023_{state_fips}_cousub_500k'
-        p = parquet_or_zip(
-            os.path.join(PARQUET_DIR, f'{base}.parquet'),
-            os.path.join(CACHE_DIR, f'{base}.zip'),
-        )
-        return gpd.read_parquet(p) if p.endswith('.parquet') else gpd.read_file(f'zip://{p}')
-    if level == 'tract':
-        base = f'cb_2023_{state_fips}_tract_500k'
-        p = parquet_or_zip(
-            os.path.join(PARQUET_DIR, f'{base}.parquet'),
-            os.path.join(CACHE_DIR, f'{base}.zip'),
-        )
-        return gpd.read_parquet(p) if p.endswith('.parquet') else gpd.read_file(f'zip://{p}')
-    if level == 'bg':
-        base = f'cb_2023_{state_fips}_bg_500k'
-        p = parquet_or_zip(
-            os.path.join(PARQUET_DIR, f'{base}.parquet'),
-            os.path.join(CACHE_DIR, f'{base}.zip'),
-        )
-        return gpd.read_parquet(p) if p.endswith('.parquet') else gpd.read_file(f'zip://{p}')
+    if level in ('subcounty', 'tract', 'bg'):
+        return read_layer(layer_path(base, lod), columns)
     if level == 'zcta':
-        zp = parquet_or_zip(
-            os.path.join(PARQUET_DIR, 'cb_2020_us_zcta520_500k.parquet'),
-            os.path.join(CACHE_DIR, 'cb_2020_us_zcta520_500k.zip'),
-        )
-        gdf = gpd.read_parquet(zp) if zp.endswith('.parquet') else gpd.read_file(f'zip://{zp}')
+        zp = layer_path(base, lod)
+        gdf = read_layer(zp, columns)
         
         if state_abbr == 'US':
             # Return all US ZCTAs (warning: large dataset!)
             return gdf
-        elif state_abbr in REGIONS:
+        assigned = zcta_assignments(zp, gdf)
+        if assigned is not None:
+            col = 'REGION' if state_abbr in REGIONS else 'STUSPS'
+            return gdf[(assigned[col] == state_abbr).to_numpy()]
+        states = read_layer(layer_path(LAYER_BASES['state']), ('STUSPS',))
+        if state_abbr in REGIONS:
             # Get ZCTAs for all states in the region
-            sp = parquet_or_zip(
-                os.path.join(PARQUET_DIR, 'cb_2023_us_state_500k.parquet'),
-                os.path.join(CACHE_DIR, 'cb_2023_us_state_500k.zip'),
-            )
-            states = gpd.read_parquet(sp) if sp.endswith('.parquet') else gpd.read_file(f'zip://{sp}')
             region_states = states[states['STUSPS'].isin(REGIONS[state_abbr])]
             region_geom = region_states.unary_union
             # Use centroid method for better performance with ZCTAs
             return gdf[gdf.geometry.centroid.within(region_geom)]
         else:
             # Single state ZCTAs
-            sp = parquet_or_zip(
-                os.path.join(PARQUET_DIR, 'cb_2023_us_state_500k.parquet'),
-                os.path.join(CACHE_DIR, 'cb_2023_us_state_500k.zip'),
-            )
-            states = gpd.read_parquet(sp) if sp.endswith('.parquet') else gpd.read_file(f'zip://{sp}')
             geom = states.loc[states['STUSPS'] == state_abbr, 'geometry'].values[0]
             return gdf[gdf.geometry.centroid.within(geom)]
     raise HTTPException(status_code=400, detail=f'unsupported level {level}')
@@ -192,47 +463,246 @@ def pick_join_key(level: str, gdf: 'gpd.GeoDataFrame') -> str:
     return 'GEOID'
 
 
-def normalize_csv_key(level: str, df: pd.DataFrame, provided: Optional[str]) -> Tuple[pd.DataFrame, str]:
-    candidates = []
-    if provided:
-        candidates = [provided]
+def requested_tolerance(zoom: Optional[float], tolerance: Optional[float]) -> Optional[float]:
+    # Explicit tolerance (metres) wins over zoom (one screen pixel at that zoom)
+    if tolerance is not None:
+        return tolerance
+    if zoom is not None:
+        return tolerance_for_zoom(zoom)
+    return None
+
+
+def layer_fingerprint(level: str) -> tuple:
+    # (name, mtime, size) of every file a response for ``level`` can be read from.
+    # Partitions and stores are derived from the layer parquet and change only with it.
+    patterns = [LAYER_BASES[level].format(fips='*')]
+    if level in ('zcta', 'subcounty', 'tract', 'bg'):
+        # State outlines pick the states for bbox queries and the ZCTA fallback
+        patterns.append(LAYER_BASES['state'])
+    paths = []
+    for pattern in patterns:
+        paths += glob.glob(os.path.join(PARQUET_DIR, pattern + '*.parquet'))
+        paths += glob.glob(os.path.join(CACHE_DIR, pattern + '.zip'))
+    if level == 'zcta':
+        paths.append(index_path(PARQUET_DIR))
+    stats = []
+    for p in sorted(paths):
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        stats.append((os.path.basename(p), st.st_mtime_ns, st.st_size))
+    return tuple(stats)
+
+
+def boundary_etag(level: str, fmt: str, state: Optional[str], bbox: Optional[str],
+                  zoom: Optional[float], tolerance: Optional[float], columns: Optional[Tuple[str, ...]] = None,
+                  simplify: Optional[float] = None) -> str:
+    layer_base(level, '{fips}')
+    return make_etag(RESPONSE_VERSION, level, fmt, (state or '').strip().upper(), bbox, zoom, tolerance,
+                     columns, simplify, _HAS_ARROW, layer_fingerprint(level))
+
+
+def boundary_cache_headers(etag: str) -> dict:
+    return {'ETag': etag, 'Cache-Control': cache_control(BOUNDARY_MAX_AGE), 'Vary': 'Accept-Encoding'}
+
+
+def lod_header(lod: Optional[int]) -> str:
+    return f'{lod}m' if lod else 'full'
+
+
+def boundary_response(gdf: 'gpd.GeoDataFrame', fmt: str = 'geojson', lod: Optional[int] = None) -> StreamingResponse:
+    # Features are encoded and sent in chunks; no full-document string is built.
+    # Starlette pulls the (sync) body iterator in its threadpool, off the event loop.
+    check_format(fmt)
+    body, media_type = encode(gdf, fmt)
+    return StreamingResponse(body, media_type=media_type, headers={'X-Boundary-LOD': lod_header(lod)})
+
+
+def pmtiles_path(name: str) -> str:
+    # Archives written by generate_vector_tiles.py: <cache>/tiles/<level>.pmtiles
+    if not re.fullmatch(r'[A-Za-z0-9_-]+', name or ''):
+        raise HTTPException(status_code=400, detail=f'invalid tile layer {name}')
+    path = os.path.join(TILES_DIR, f'{name}.pmtiles')
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f'no tiles for {name}; run tools/generate_vector_tiles.py')
+    return path
+
+
+_PMTILES_READERS = {}
+_PMTILES_LOCK = threading.Lock()
+
+
+def pmtiles_reader(path: str):
+    from pmtiles.reader import MmapSource, Reader
+
+    version = os.stat(path).st_mtime_ns
+    with _PMTILES_LOCK:
+        entry = _PMTILES_READERS.get(path)
+        if entry is None or entry[0] != version:
+            f = open(path, 'rb')
+            entry = (version, Reader(MmapSource(f)))
+            _PMTILES_READERS[path] = entry
+        return entry[1]
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # Single 'bytes=start-end' / 'bytes=start-' / 'bytes=-suffix' range, as sent by pmtiles.js
+    m = re.fullmatch(r'bytes=(\d*)-(\d*)', (header or '').strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
     else:
-        defaults = {
-            'state': ['STATEFP','statefp','STATE','state','STUSPS','stusps','GEOID','FIPS'],
-            'county': ['GEOID','FIPS','FIPS5','COUNTYFP','CountyFIPS'],
-            'place': ['GEOID','PlaceGEOID'],
-            'subcounty': ['GEOID'],
-            'tract': ['GEOID'],
-            'bg': ['GEOID'],
-            'zcta': ['ZIP','Zip','zip','ZCTA','ZCTA5','GEOID'],
-        }
-        candidates = defaults.get(level, ['GEOID'])
-    key = next((c for c in candidates if c in df.columns), None)
-    if not key:
-        raise HTTPException(status_code=400, detail=f'could not find join column in CSV (tried: {candidates})')
-    s = df[key].astype(str)
-    if level == 'state': df['_J'] = s.str.extract(r'(\d+)')[0].str.zfill(2).fillna('')
-    elif level == 'county': df['_J'] = s.str.extract(r'(\d+)')[0].str.zfill(5).fillna('')
-    elif level == 'place': df['_J'] = s.str.extract(r'(\d+)')[0].str.zfill(7).fillna('')
-    elif level == 'subcounty': df['_J'] = s.str.extract(r'(\d+)')[0].str.zfill(10).fillna('')
-    elif level == 'tract': df['_J'] = s.str.extract(r'(\d+)')[0].str.zfill(11).fillna('')
-    elif level == 'bg': df['_J'] = s.str.extract(r'(\d+)')[0].str.zfill(12).fillna('')
-    elif level == 'zcta': df['_J'] = s.str.extract(r'(\d+)')[0].str.zfill(5).fillna('')
-    else: df['_J'] = s
-    return df, '_J'
-
-
-def compute_rates(df: pd.DataFrame) -> None:
-    needed = ['Households', 'Poverty Households', 'ALICE Households']
-    if all(c in df.columns for c in needed):
-        hh = df['Households'].astype(float)
-        below = df['Poverty Households'].astype(float) + df['ALICE Households'].astype(float)
-        df['Below_ALICE_Rate'] = (below / hh).where(hh > 0)
-        df['Poverty_Rate'] = (df['Poverty Households'].astype(float) / hh).where(hh > 0)
-        df['ALICE_Rate'] = (df['ALICE Households'].astype(float) / hh).where(hh > 0)
-
-
-app = FastAPI(title='Local Boundary & Join API')
+        start = max(size - int(m.group(2)), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail='range not satisfiable', headers={'Content-Range': f'bytes */{size}'})
+    return start, end
+
+
+_WARMUP_STATUS: dict = {}
+_WARMUP_LOCK = threading.Lock()
+# Process mode: each worker's warm-up status by pid, as reported back to the main process
+_WORKER_WARMUP: dict = {}
+
+
+def _set_warmup(level: str, **info) -> None:
+    with _WARMUP_LOCK:
+        _WARMUP_STATUS[level] = info
+
+
+def warm_layers(levels: List[str]) -> None:
+    """Load national layers into the boundary cache, with their spatial index and ZCTA assignments."""
+    for level in levels:
+        _set_warmup(level, status='pending')
+    for level in levels:
+        base = LAYER_BASES.get(level)
+        if base is None or '{fips}' in base:
+            _set_warmup(level, status='skipped', detail='not a national layer')
+            continue
+        path = layer_path(base)
+        if not os.path.exists(path):
+            _set_warmup(level, status='missing', path=path)
+            continue
+        _set_warmup(level, status='loading', path=path)
+        t0 = time.time()
+        store = boundary_store(base) if WORKER_MODE == 'process' else None
+        if store is not None:
+            # Worker processes share the mapped store instead of each decoding the layer
+            _set_warmup(level, status='ready', path=path, store=store.path, features=store.num_rows,
+                        seconds=round(time.time() - t0, 2))
+            continue
+        try:
+            gdf = read_layer(path)
+            gdf.sindex
+            if level == 'zcta':
+                zcta_assignments(path, gdf)
+        except Exception as e:
+            _set_warmup(level, status='error', path=path, error=str(e))
+            continue
+        _set_warmup(level, status='ready', path=path, features=len(gdf), seconds=round(time.time() - t0, 2))
+
+
+def warmup_status() -> dict:
+    if WORKER_MODE == 'process':
+        return _process_warmup_status()
+    with _WARMUP_LOCK:
+        layers = {level: dict(info) for level, info in _WARMUP_STATUS.items()}
+    for info in layers.values():
+        if info['status'] == 'ready' and 'store' not in info and cached_layer(info['path']) is None:
+            # Loaded, but pushed out of the cache since (budget too small)
+            info['status'] = 'evicted'
+    return {'enabled': WARMUP_ENABLED, 'layers': layers}
+
+
+def _warm_worker(reports=None) -> None:
+    # Worker process initializer: warm this worker's cache, then report its status to the main process
+    if WARMUP_ENABLED and gpd is not None and WARM_LAYERS:
+        warm_layers(WARM_LAYERS)
+        if reports is not None:
+            with _WARMUP_LOCK:
+                layers = {level: dict(info) for level, info in _WARMUP_STATUS.items()}
+            reports.put((os.getpid(), layers))
+
+
+def _collect_worker_warmup(reports) -> None:
+    # Main process: record each worker's report until shutdown sends None
+    for pid, layers in iter(reports.get, None):
+        with _WARMUP_LOCK:
+            _WORKER_WARMUP[pid] = layers
+
+
+def _process_warmup_status() -> dict:
+    # One entry per layer: 'pending' until a worker reports, else the workers' common status
+    # ('mixed' if they differ), with the per-worker statuses alongside
+    with _WARMUP_LOCK:
+        reports = {pid: layers for pid, layers in _WORKER_WARMUP.items()}
+    layers = {}
+    for level in (WARM_LAYERS if WARMUP_ENABLED else []):
+        seen = {pid: r.get(level, {'status': 'pending'}) for pid, r in reports.items()}
+        statuses = {info['status'] for info in seen.values()}
+        info = dict(next(iter(seen.values()))) if len(statuses) == 1 else {'status': 'mixed' if statuses else 'pending'}
+        info['workers_reported'] = f'{len(seen)}/{WORKERS}'
+        info['workers'] = {str(pid): r['status'] for pid, r in seen.items()}
+        layers[level] = info
+    return {'enabled': WARMUP_ENABLED, 'layers': layers,
+            'detail': 'warm-up runs in each worker process at startup; layers with a store are mapped, not loaded'}
+
+
+class JobError(Exception):
+    # HTTPException does not survive pickling back from a worker process
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _call_job(fn, *args):
+    try:
+        return fn(*args)
+    except HTTPException as e:
+        raise JobError(e.status_code, e.detail)
+
+
+POOL = WorkerPool(WORKER_MODE, WORKERS, MAX_CONCURRENT, MAX_QUEUE,
+                  initializer=_warm_worker if WORKER_MODE == 'process' else None)
+# Identical concurrent /boundaries (or /join) requests share one job
+BOUNDARY_REQUESTS = Coalescer()
+JOIN_REQUESTS = Coalescer()
+
+
+async def run_job(fn, *args):
+    try:
+        return await POOL.run(_call_job, fn, *args)
+    except PoolBusy as e:
+        raise HTTPException(status_code=503, detail=f'engine busy: {e}', headers={'Retry-After': '1'})
+    except JobError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs in a daemon thread so startup and /health never wait for it
+    if WORKER_MODE != 'process' and WARMUP_ENABLED and gpd is not None and WARM_LAYERS:
+        threading.Thread(target=warm_layers, args=(WARM_LAYERS,), name='boundary-warmup', daemon=True).start()
+    reports = None
+    if WORKER_MODE == 'process' and WARMUP_ENABLED and gpd is not None and WARM_LAYERS:
+        # Start the workers now so each warms up in the background, not on the first request
+        reports = multiprocessing.Queue()
+        threading.Thread(target=_collect_worker_warmup, args=(reports,), name='warmup-reports', daemon=True).start()
+        POOL.prestart((reports,))
+    yield
+    POOL.shutdown()
+    if reports is not None:
+        reports.put(None)
+
+
+app = FastAPI(title='Local Boundary & Join API', lifespan=lifespan)
+
+# Response headers the web app may read cross-origin
+EXPOSED_HEADERS = ['ETag', 'X-Boundary-LOD', 'X-Join-Cache', 'X-Join-Stats']
 
 # Permissive CORS during development if env set
 ALLOW_ALL = bool(os.environ.get('CHOROPLETH_CORS_ALLOW_ALL'))
@@ -244,6 +714,7 @@ if ALLOW_ALL:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=EXPOSED_HEADERS,
     )
 else:
     app.add_middleware(
@@ -256,6 +727,7 @@ else:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=EXPOSED_HEADERS,
     )
 
 # Serve the local web app to avoid mixed-content/CORS when using GitHub Pages
@@ -287,43 +759,299 @@ def app_quick():
 
 @app.get('/health')
 def health() -> dict:
-    return {'status': 'ok', 'cache_dir': CACHE_DIR}
+    # In process mode the boundary cache lives in each worker; the main process's own copy stays empty
+    cache_key = 'main_process_boundary_cache' if WORKER_MODE == 'process' else 'boundary_cache'
+    return {'status': 'ok', 'cache_dir': CACHE_DIR, cache_key: BOUNDARY_CACHE.stats(), 'warmup': warmup_status(), 'workers': POOL.stats(),
+            'boundary_requests': BOUNDARY_REQUESTS.stats(), 'response_store': RESPONSE_STORE.stats(),
+            'join_cache': JOIN_CACHE.stats()}
 
 
-@app.get('/boundaries')
-def boundaries(state: str, level: str):
-    abbr, fips = norm_state(state)
-    gdf = load_boundary(level, abbr, fips)
-    return JSONResponse(content=gdf.to_json())
+@app.get('/tiles/{name}.pmtiles')
+def tiles_archive(name: str, request: Request):
+    path = pmtiles_path(name)
+    size = os.path.getsize(path)
+    rng = parse_range(request.headers.get('range'), size)
+    headers = {'Accept-Ranges': 'bytes'}
+    if rng is None:
+        return FileResponse(path, media_type='application/octet-stream', headers=headers)
+    start, end = rng
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start + 1)
+    headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return Response(content=data, status_code=206, media_type='application/octet-stream', headers=headers)
 
 
-@app.post('/join')
-async def join(state: str = Form(...), level: str = Form(...), join_col: Optional[str] = Form(None), simplify: Optional[float] = Form(None), csv: UploadFile = File(...)):
-    # Handle special cases where norm_state returns the same value for both
-    if state in ['US', 'NORTHEAST', 'MIDWEST', 'SOUTH', 'WEST']:
-        abbr = state
-        fips = state
+@app.get('/tiles/{name}/{z}/{x}/{y}.mvt')
+def tile(name: str, z: int, x: int, y: int):
+    data = pmtiles_reader(pmtiles_path(name)).get(z, x, y)
+    if data is None:
+        return Response(status_code=204)
+    return Response(content=data, media_type='application/vnd.mapbox-vector-tile', headers={'Content-Encoding': 'gzip'})
+
+
+def boundaries_job(level: str, state: Optional[str], bbox: Optional[str], zoom: Optional[float],
+                   tolerance: Optional[float], columns: Optional[Tuple[str, ...]] = None,
+                   simplify: Optional[float] = None) -> Tuple['gpd.GeoDataFrame', Optional[int]]:
+    # `simplify` (degrees) works as on /join: a precomputed LOD when one fits, else simplified here
+    if tolerance is None and simplify:
+        tolerance = simplify * METRES_PER_DEGREE
+    tol = requested_tolerance(zoom, tolerance)
+    box = parse_bbox(bbox) if bbox else None
+    if box and not state:
+        gdf, lod = load_boundary_bbox(level, box, tol, columns)
+    elif not state:
+        raise HTTPException(status_code=400, detail='state or bbox is required')
     else:
         abbr, fips = norm_state(state)
-    
-    gdf = load_boundary(level, abbr, fips)
-    raw = await csv.read()
-    try:
-        df = pd.read_csv(io.BytesIO(raw), encoding='utf-8-sig')
-    except Exception:
-        df = pd.read_csv(io.BytesIO(raw))
-    df, jcol = normalize_csv_key(level, df, join_col)
+        lod = select_lod(layer_base(level, fips), tol)
+        gdf = load_boundary(level, abbr, fips, lod, columns)
+        if box:
+            gdf = bbox_query(gdf, box)
+    if simplify and lod is None:
+        gdf = gdf.set_geometry(gdf.geometry.simplify(float(simplify), preserve_topology=True))
+    return gdf, lod
+
+
+def boundary_body_job(level: str, state: Optional[str], bbox: Optional[str], zoom: Optional[float],
+                      tolerance: Optional[float], fmt: str, encoding: str, etag: str,
+                      columns: Optional[Tuple[str, ...]] = None, simplify: Optional[float] = None) -> Tuple[str, Optional[int]]:
+    # Load, encode and compress in one job: in process mode only the file path comes back
+    gdf, lod = boundaries_job(level, state, bbox, zoom, tolerance, columns, simplify)
+    body, _ = encode(gdf, fmt)
+    return write_compressed(RESPONSE_STORE.path_for(etag, encoding, lod), encoding, body), lod
+
+
+def _join_state(state: str) -> Tuple[str, str]:
+    # Handle special cases where norm_state returns the same value for both
+    if state in ['US', 'NORTHEAST', 'MIDWEST', 'SOUTH', 'WEST']:
+        return state, state
+    return norm_state(state)
+
+
+def read_join_csv(path: str, level: str, join_col: Optional[str], columns: Optional[Tuple[str, ...]] = None,
+                  dataset: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    # The CSV with its derived metrics, and its join column; with `columns`, only those and
+    # the key are parsed. Kept per `dataset` (upload hash), so re-joining the same upload at
+    # another state, zoom or format skips the parse and the metrics; treat as read-only.
+    header = read_header(path)
+    key = find_key_column(level, header, join_col)
+    if not key:
+        tried = [join_col] if join_col else KEY_CANDIDATES.get(level, ['GEOID'])
+        raise HTTPException(status_code=400, detail=f'could not find join column in CSV (tried: {tried})')
+    usecols = [key, *columns] if columns else None
+
+    def load():
+        return add_metrics(read_csv(path, columns=usecols, string_columns=[key]))
+
+    if dataset is None:
+        return load(), key
+    # Content-addressed: the hash is the version, so the entry never goes stale
+    return BOUNDARY_CACHE.get_or_load(('csv', dataset, key, tuple(usecols) if usecols else None), 0, load), key
+
+
+def join_codes(level: str, gdf: 'gpd.GeoDataFrame', df: pd.DataFrame, key: str) -> Tuple[str, np.ndarray, np.ndarray, np.ndarray]:
+    # Boundary and CSV keys as int64 GEOID codes: (bkey, boundary codes, CSV codes, CSV invalid mask)
     bkey = pick_join_key(level, gdf)
-    gdf['_J'] = gdf[bkey].astype(str)
-    if level == 'zcta':
-        gdf['_J'] = gdf['_J'].str.zfill(5)
-    mg = gdf.merge(df, how='left', left_on='_J', right_on=jcol)
-    compute_rates(mg)
-    if simplify and 'geometry' in mg:
+    bcodes, _ = level_codes(level, gdf[bkey])
+    ccodes, invalid = level_codes(level, df[key])
+    return bkey, bcodes, ccodes, invalid
+
+
+def join_job(state: str, level: str, join_col: Optional[str], simplify: Optional[float],
+             zoom: Optional[float], path: str, columns: Optional[Tuple[str, ...]] = None,
+             fields: Optional[Tuple[str, ...]] = None, dataset: Optional[str] = None) -> Tuple['gpd.GeoDataFrame', Optional[int]]:
+    abbr, fips = _join_state(state)
+    
+    # `simplify` is in degrees; served from a precomputed LOD when one fits
+    tol = requested_tolerance(zoom, simplify * METRES_PER_DEGREE if simplify else None)
+    lod = select_lod(layer_base(level, fips), tol)
+    gdf = load_boundary(level, abbr, fips, lod, fields)
+    df, key = read_join_csv(path, level, join_col, columns, dataset)
+    _, bcodes, ccodes, _ = join_codes(level, gdf, df, key)
+    mg = index_join(gdf, df, bcodes, ccodes)
+    if simplify and lod is None and 'geometry' in mg:
         try: mg['geometry'] = mg.geometry.simplify(float(simplify), preserve_topology=True)
         except Exception: pass
-    mg = mg.drop(columns=[c for c in mg.columns if c == '_J'])
-    return JSONResponse(content=mg.to_json())
+    return mg, lod
+
+
+def join_attributes_job(state: str, level: str, join_col: Optional[str], path: str,
+                        columns: Optional[Tuple[str, ...]] = None, dataset: Optional[str] = None) -> Tuple[pd.DataFrame, dict]:
+    """
+    CSV rows that match a boundary feature, keyed by the boundary's own key
+    column (GEOID, GEOID20, ...) so a client can attach them to geometry it
+    already has from /boundaries. Returns the table and match statistics.
+    """
+    abbr, fips = _join_state(state)
+    # Only the key columns: no boundary attributes go into the table
+    gdf = load_boundary(level, abbr, fips, columns=REQUIRED_FIELDS.get(level))
+    df, key = read_join_csv(path, level, join_col, columns, dataset)
+    bkey, bcodes, ccodes, invalid = join_codes(level, gdf, df, key)
+    matched = np.isin(ccodes, bcodes[bcodes >= 0]) & ~invalid
+    original = pd.Series(gdf[bkey].to_numpy(), index=bcodes)
+    out = df.loc[matched]
+    out = out.drop(columns=[c for c in out.columns if c == bkey])
+    out.insert(0, bkey, original[~original.index.duplicated()].reindex(ccodes[matched]).to_numpy())
+    stats = {
+        'csv_rows': len(df),
+        'matched_rows': int(matched.sum()),
+        'unmatched_rows': int((~matched).sum()),
+        'invalid_keys': int(invalid.sum()),
+        'duplicate_keys': int(out[bkey].duplicated().sum()),
+        'features': len(gdf),
+        'features_matched': int(np.isin(bcodes, ccodes[~invalid]).sum()),
+        'unmatched_sample': df.loc[~matched, key].head(10).astype(str).tolist(),
+    }
+    return out.reset_index(drop=True), {'key': bkey, 'level': level, 'stats': stats}
+
+
+def join_body_job(state: str, level: str, join_col: Optional[str], simplify: Optional[float],
+                  zoom: Optional[float], fmt: str, path: str, columns: Optional[Tuple[str, ...]],
+                  fields: Optional[Tuple[str, ...]] = None, dataset: Optional[str] = None) -> Tuple[bytes, Optional[int]]:
+    mg, lod = join_job(state, level, join_col, simplify, zoom, path, columns, fields, dataset)
+    body, _ = encode(mg, fmt)
+    return gzip_chunks(body), lod
+
+
+def join_attributes_body_job(state: str, level: str, join_col: Optional[str], fmt: str, path: str,
+                             columns: Optional[Tuple[str, ...]], dataset: Optional[str] = None) -> Tuple[bytes, dict]:
+    table, meta = join_attributes_job(state, level, join_col, path, columns, dataset)
+    body, _ = encode_attributes(table, meta, fmt)
+    return gzip_chunks(body), meta['stats']
+
+
+def join_cache_key(state: str, level: str, join_col: Optional[str], simplify: Optional[float],
+                   zoom: Optional[float], fmt: str, csv_sha256: str, attributes: bool = False,
+                   columns: Optional[Tuple[str, ...]] = None, fields: Optional[Tuple[str, ...]] = None) -> str:
+    layer_base(level, '{fips}')
+    return content_key('join', RESPONSE_VERSION, csv_sha256, level, state.strip().upper(),
+                       join_col, simplify, zoom, fmt, attributes, columns, fields, layer_fingerprint(level))
+
+
+def iter_gunzip(body: bytes, chunk_size: int = UPLOAD_CHUNK):
+    # Inflate a gzip body a chunk at a time (StreamingResponse runs this in the threadpool)
+    d = zlib.decompressobj(wbits=31)
+    for i in range(0, len(body), chunk_size):
+        out = d.decompress(body[i:i + chunk_size])
+        if out:
+            yield out
+    tail = d.flush()
+    if tail:
+        yield tail
+
+
+async def spool_upload(upload: UploadFile) -> Spool:
+    # Copied to a temp file in chunks and hashed on the way; never held whole in memory
+    spool = Spool()
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK)
+            if not chunk:
+                break
+            spool.write(chunk)
+    except BaseException:
+        spool.remove()
+        raise
+    spool.close()
+    return spool
+
+
+def check_format(fmt: str) -> None:
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"unsupported format {fmt} (use one of: {', '.join(FORMATS)})")
+
+
+@app.get('/boundaries')
+async def boundaries(request: Request, level: str, state: Optional[str] = None, bbox: Optional[str] = None,
+                     fmt: str = Query('geojson', alias='format'),
+                     zoom: Optional[float] = None, tolerance: Optional[float] = None, fields: Optional[str] = None,
+                     simplify: Optional[float] = None):
+    check_format(fmt)
+    # Attributes to send: the level's defaults, a comma-separated list, or 'all'
+    cols = layer_columns(level, fields)
+    # The ETag stats the layer files and the response store lists, stats and evicts files: off the event loop
+    etag = await run_in_threadpool(boundary_etag, level, fmt, state, bbox, zoom, tolerance, cols, simplify)
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=boundary_cache_headers(etag))
+    encoding = pick_encoding(request.headers.get('accept-encoding'))
+    if encoding is None:
+        key = (level, (state or '').strip().upper(), bbox, zoom, tolerance, cols, simplify)
+        gdf, lod = await BOUNDARY_REQUESTS.run(key, lambda: run_job(boundaries_job, level, state, bbox, zoom, tolerance, cols, simplify))
+        response = boundary_response(gdf, fmt, lod)
+        response.headers.update(boundary_cache_headers(etag))
+        return response
+    stored = await run_in_threadpool(RESPONSE_STORE.find, etag, encoding)
+    if stored is None:
+        path, lod = await BOUNDARY_REQUESTS.run(
+            ('body', etag, encoding),
+            lambda: run_job(boundary_body_job, level, state, bbox, zoom, tolerance, fmt, encoding, etag, cols, simplify),
+        )
+        await run_in_threadpool(RESPONSE_STORE.add, etag, encoding, lod, path)
+    else:
+        path, lod = stored
+    headers = boundary_cache_headers(etag)
+    headers.update({'Content-Encoding': encoding, 'X-Boundary-LOD': lod_header(lod)})
+    return FileResponse(path, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+@app.post('/join')
+async def join(request: Request, state: str = Form(...), level: str = Form(...), join_col: Optional[str] = Form(None), simplify: Optional[float] = Form(None), zoom: Optional[float] = Form(None), fmt: str = Form('geojson', alias='format'), attributes: bool = Form(False), columns: Optional[str] = Form(None), fields: Optional[str] = Form(None), csv: UploadFile = File(...)):
+    if attributes:
+        # Attribute table only: geojson (the default) means columnar JSON here
+        fmt = 'json' if fmt == 'geojson' else fmt
+        if fmt not in ATTRIBUTE_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"unsupported format {fmt} with attributes (use one of: {', '.join(ATTRIBUTE_MEDIA_TYPES)})")
+        media_type = ATTRIBUTE_MEDIA_TYPES[fmt]
+        simplify = zoom = None
+    else:
+        check_format(fmt)
+        media_type = MEDIA_TYPES[fmt]
+    # Optional comma-separated CSV columns to keep (the join column is always read)
+    cols = tuple(c.strip() for c in columns.split(',') if c.strip()) if columns else None
+    # Boundary attributes to keep, as for /boundaries (unused with attributes: only the key is sent)
+    layer_cols = None if attributes else layer_columns(level, fields)
+    spool = await spool_upload(csv)
+    handed_off = False
+    try:
+        # File reads/writes of the result cache (and the layer stats in its key) stay off the event loop
+        key = await run_in_threadpool(join_cache_key, state, level, join_col, simplify, zoom, fmt, spool.sha256,
+                                      attributes, cols, layer_cols)
+        cached = await run_in_threadpool(JOIN_CACHE.get, key)
+        if cached is not None:
+            body, meta = cached
+            status = 'hit'
+        else:
+            async def run():
+                # Owns the spool from here: removed when the job ends, even if this client has gone
+                try:
+                    if attributes:
+                        return await run_job(join_attributes_body_job, state, level, join_col, fmt, spool.path, cols, spool.sha256)
+                    return await run_job(join_body_job, state, level, join_col, simplify, zoom, fmt, spool.path, cols, layer_cols, spool.sha256)
+                finally:
+                    spool.remove()
+
+            def start():
+                nonlocal handed_off
+                handed_off = True
+                return run()
+
+            body, info = await JOIN_REQUESTS.run(key, start)
+            meta = {'stats': info} if attributes else {'lod': info}
+            await run_in_threadpool(JOIN_CACHE.put, key, body, meta)
+            status = 'miss'
+    finally:
+        if not handed_off:
+            spool.remove()
+    headers = {'X-Join-Cache': status, 'Vary': 'Accept-Encoding'}
+    if attributes:
+        headers['X-Join-Stats'] = json.dumps({k: v for k, v in meta['stats'].items() if k != 'unmatched_sample'})
+    else:
+        headers['X-Boundary-LOD'] = lod_header(meta.get('lod'))
+    if pick_encoding(request.headers.get('accept-encoding'), ('gzip',)) is None:
+        return StreamingResponse(iter_gunzip(body), media_type=media_type, headers=headers)
+    headers['Content-Encoding'] = 'gzip'
+    return Response(content=body, media_type=media_type, headers=headers)
 
 
 if __name__ == '__main__':
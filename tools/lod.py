@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Precomputed levels of detail (LOD) for cached boundary layers.
+
+convert_cache_to_parquet.py writes each layer once per tolerance next to the
+full-resolution file (``<base>.lod<metres>m.parquet``); the local engine
+picks the coarsest level that is still finer than the requested zoom or
+tolerance instead of simplifying on every request.
+"""
+
+import math
+from typing import Iterable, Iterator, Optional, Tuple
+
+try:
+    from tools.topology import build_topology, simplify_shared
+except ImportError:  # pragma: no cover - run as a script from tools/
+    from topology import build_topology, simplify_shared
+
+# Douglas-Peucker tolerances in EPSG:3857 metres, coarse -> fine; roughly one
+# screen pixel at zoom 4, 6, 8 and 10. Closer zooms get the full-resolution layer.
+LOD_TOLERANCES = (9500, 2400, 600, 150)
+
+# Ground metres per 256px tile pixel at zoom 0 (equator)
+METRES_PER_PIXEL_Z0 = 2 * math.pi * 6378137.0 / 256
+# Rough metres per degree, for the legacy `simplify` (degrees) parameter
+METRES_PER_DEGREE = 111320.0
+
+
+def lod_name(base: str, tolerance: int) -> str:
+    return f"{base}.lod{int(tolerance)}m"
+
+
+def tolerance_for_zoom(zoom: float) -> float:
+    """Simplification that stays below one screen pixel at ``zoom``."""
+    return METRES_PER_PIXEL_Z0 / (2 ** max(float(zoom), 0.0))
+
+
+def pick_lod(tolerance_m: Optional[float], available: Iterable[int]) -> Optional[int]:
+    """Coarsest available tolerance not exceeding ``tolerance_m``; None means full resolution."""
+    if not tolerance_m or tolerance_m <= 0:
+        return None
+    fits = [t for t in available if t <= tolerance_m]
+    return max(fits) if fits else None
+
+
+def simplify_levels(gdf, tolerances: Iterable[float], crs=None) -> Iterator[Tuple[float, object]]:
+    """
+    Yield ``(tolerance, layer)`` simplified in Web Mercator metres along shared
+    borders, returned in ``crs`` (default: the input CRS). The topology is
+    built once for all tolerances.
+    """
+    projected = gdf.to_crs('EPSG:3857')
+    geoms = projected.geometry.values
+    topo = build_topology(geoms)
+    for tol in tolerances:
+        out = projected.copy()
+        out['geometry'] = simplify_shared(geoms, tol, topo=topo)
+        yield tol, out.to_crs(crs or gdf.crs)
+
+
+def simplify_layer(gdf, tolerance_m: float, crs=None):
+    return next(simplify_levels(gdf, [tolerance_m], crs))[1]
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Derived metrics (ALICE rates) added to joined data, shared by choropleth.py and the local engine.
+
+Each metric in ``METRICS`` is declared as a ratio of column sums. ``evaluate``
+converts every source column the applicable metrics need to float64 once and
+computes all of them from those arrays, so adding an indicator adds one
+division, not another pass of conversions over the frame.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Metric:
+    """``name`` = sum(numerator) / sum(denominator); null where the denominator is not positive."""
+    name: str
+    numerator: Tuple[str, ...]
+    denominator: Tuple[str, ...]
+
+    @property
+    def sources(self) -> Tuple[str, ...]:
+        return self.numerator + self.denominator
+
+
+METRICS: Tuple[Metric, ...] = (
+    Metric('Below_ALICE_Rate', ('Poverty Households', 'ALICE Households'), ('Households',)),
+    Metric('Poverty_Rate', ('Poverty Households',), ('Households',)),
+    Metric('ALICE_Rate', ('ALICE Households',), ('Households',)),
+)
+
+
+def applicable(columns: Iterable[str], metrics: Sequence[Metric] = METRICS) -> List[Metric]:
+    """The metrics whose source columns are all present."""
+    present = set(columns)
+    return [m for m in metrics if all(c in present for c in m.sources)]
+
+
+def _as_float(col: pd.Series) -> np.ndarray:
+    if col.dtype.kind in 'iufb':
+        return col.to_numpy(dtype=np.float64, na_value=np.nan)
+    return col.astype(np.float64).to_numpy()
+
+
+def evaluate(df: pd.DataFrame, metrics: Sequence[Metric] = METRICS) -> Dict[str, np.ndarray]:
+    """Values of every applicable metric for the rows of ``df``, by name."""
+    todo = applicable(df.columns, metrics)
+    if not todo:
+        return {}
+    sources = list(dict.fromkeys(c for m in todo for c in m.sources))
+    values = np.empty((len(sources), len(df)), dtype=np.float64)
+    for i, c in enumerate(sources):
+        values[i] = _as_float(df[c])
+    row = {c: i for i, c in enumerate(sources)}
+
+    # Sums shared between metrics (e.g. the Households denominator) are computed once
+    sums: Dict[Tuple[str, ...], np.ndarray] = {}
+
+    def total(cols: Tuple[str, ...]) -> np.ndarray:
+        if cols not in sums:
+            sums[cols] = values[row[cols[0]]] if len(cols) == 1 else values[[row[c] for c in cols]].sum(axis=0)
+        return sums[cols]
+
+    out = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for m in todo:
+            den = total(m.denominator)
+            out[m.name] = np.where(den > 0, total(m.numerator) / den, np.nan)
+    return out
+
+
+def add_metrics(df: pd.DataFrame, metrics: Sequence[Metric] = METRICS) -> pd.DataFrame:
+    """``df`` with a column per applicable metric appended (a new frame; ``df`` is not modified)."""
+    values = evaluate(df, metrics)
+    return df.assign(**values) if values else df
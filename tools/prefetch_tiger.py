@@ -1,11 +1,28 @@
 #!/usr/bin/env python3
+"""
+Fill the TIGER cache directory with the boundary zips the tools use.
+
+Files are fetched concurrently over one pooled HTTP session, streamed to
+``<name>.part`` and resumed with a Range/If-Range request after a dropped
+connection (restarting if the file changed meanwhile). Completed files are recorded with size and SHA-256 in
+``<cache>/manifest.json``; a file counts as cached only if it matches its
+manifest entry.
+"""
+
 import argparse
+import hashlib
+import json
 import os
-from typing import List
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from alice_choropleth import (
+from choropleth import (
     place_url,
     zcta_urls,
     cousub_url,
@@ -16,58 +33,203 @@ from alice_choropleth import (
     STATE_ABBR_TO_FIPS,
 )
 
+MANIFEST_NAME = 'manifest.json'
+CHUNK_SIZE = 1 << 20
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class NotFound(RuntimeError):
+    """The server has no such file (e.g. a territory without tracts); not retried."""
+
+
+def make_session(workers: int, insecure: bool = False) -> requests.Session:
+    # One connection pool shared by all workers, sized so none of them waits for a socket
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.verify = not insecure
+    return session
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Manifest:
+    """Completed downloads in <cache>/manifest.json: {file: {size, sha256, url}}."""
+
+    def __init__(self, dest_dir: str):
+        self.dest_dir = dest_dir
+        self.path = os.path.join(dest_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries: Dict[str, dict] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_complete(self, fn: str, verify: bool = False) -> bool:
+        path = os.path.join(self.dest_dir, fn)
+        if not os.path.exists(path):
+            return False
+        entry = self.entries.get(fn)
+        if entry is None:
+            # Downloaded before the manifest existed: adopt it if it is a readable zip
+            if not zipfile.is_zipfile(path):
+                return False
+            self.record(fn, path, url=None)
+            return True
+        if os.path.getsize(path) != entry.get('size'):
+            return False
+        return not verify or sha256_file(path) == entry.get('sha256')
+
+    def record(self, fn: str, path: str, url: Optional[str]) -> None:
+        entry = {'size': os.path.getsize(path), 'sha256': sha256_file(path), 'url': url}
+        with self._lock:
+            self.entries[fn] = entry
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+def _validator_path(part: str) -> str:
+    return part + '.validator'
+
+
+def _load_validator(part: str, url: str) -> Optional[str]:
+    # The ETag (strong only) or Last-Modified the .part was started from, for If-Range
+    try:
+        with open(_validator_path(part)) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return saved.get('validator') if saved.get('url') == url else None
+
 
-def download(url: str, dest_dir: str, insecure: bool = False, max_retries: int = 6, retry_wait: float = 2.0) -> str:
-    os.makedirs(dest_dir, exist_ok=True)
+def _save_validator(part: str, url: str, r: requests.Response) -> None:
+    etag = r.headers.get('ETag')
+    validator = etag if etag and not etag.startswith('W/') else r.headers.get('Last-Modified')
+    with open(_validator_path(part), 'w') as f:
+        json.dump({'url': url, 'validator': validator}, f)
+
+
+def remove_part(part: str) -> None:
+    for path in (part, _validator_path(part)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _fetch_once(session: requests.Session, url: str, part: str) -> int:
+    # Append to an existing .part with a Range request; returns bytes received.
+    # If-Range makes a server whose file changed since the .part was started send
+    # the whole new file (200) instead of appending its bytes to the old prefix.
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    validator = _load_validator(part, url) if offset else None
+    if offset and not validator:
+        # Nothing to prove the .part is from the current file: start over
+        remove_part(part)
+        offset = 0
+    headers = {'Range': f'bytes={offset}-', 'If-Range': validator} if offset else {}
+    with session.get(url, stream=True, timeout=(15, 120), headers=headers) as r:
+        if r.status_code == 404:
+            raise NotFound(f"HTTP 404: {url}")
+        if r.status_code == 416:
+            # Stale .part (file changed or already complete): start over
+            remove_part(part)
+            raise RuntimeError("HTTP 416")
+        if r.status_code in RETRY_STATUS or r.status_code not in (200, 206):
+            raise RuntimeError(f"HTTP {r.status_code}")
+        # 200: the file changed (If-Range) or the server ignored the Range header
+        mode = 'ab' if r.status_code == 206 else 'wb'
+        if mode == 'wb':
+            _save_validator(part, url, r)
+        received = 0
+        with open(part, mode) as f:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                received += len(chunk)
+    return received
+
+
+def download(session: requests.Session, url: str, dest_dir: str, manifest: Manifest,
+             max_retries: int = 6, retry_wait: float = 2.0) -> Tuple[str, int]:
+    """Fetch ``url`` into ``dest_dir``; returns (path, bytes received)."""
     fn = os.path.basename(url)
     out = os.path.join(dest_dir, fn)
-    if os.path.exists(out):
+    if manifest.is_complete(fn):
         print(f"cached: {fn}")
-        return out
-    last_err = None
+        return out, 0
+    part = out + '.part'
+    received = 0
     for attempt in range(1, max_retries + 1):
         try:
-            r = requests.get(url, timeout=120, verify=(not insecure))
-            if r.status_code in (429, 500, 502, 503, 504):
-                raise RuntimeError(f"HTTP {r.status_code}")
-            if r.status_code != 200:
-                raise RuntimeError(f"HTTP {r.status_code}")
-            with open(out, 'wb') as f:
-                f.write(r.content)
-            print(f"downloaded: {fn}")
-            break
+            received += _fetch_once(session, url, part)
+            if not zipfile.is_zipfile(part):
+                remove_part(part)
+                raise RuntimeError("incomplete or corrupt zip")
+            os.replace(part, out)
+            remove_part(part)
+            manifest.record(fn, out, url)
+            print(f"downloaded: {fn} ({received / 1e6:.1f} MB)")
+            return out, received
+        except NotFound:
+            raise
         except Exception as e:
-            last_err = e
             if attempt == max_retries:
-                raise RuntimeError(f"failed after {attempt} tries: {url}: {last_err}")
-            import time
+                raise RuntimeError(f"failed after {attempt} tries: {url}: {e}")
             time.sleep(retry_wait * (2 ** (attempt - 1)))
-    return out
+    return out, received
 
 
-def resolve_first_available(urls: List[str], insecure: bool = False, max_retries: int = 6, retry_wait: float = 2.0) -> str:
+def resolve_first_available(session: requests.Session, urls: List[str], max_retries: int = 6, retry_wait: float = 2.0) -> str:
     for u in urls:
         for attempt in range(1, max_retries + 1):
             try:
-                h = requests.head(u, allow_redirects=True, timeout=30, verify=(not insecure))
+                h = session.head(u, allow_redirects=True, timeout=30)
                 if h.ok:
                     return u
+                if h.status_code == 404:
+                    break
             except Exception:
                 pass
             if attempt < max_retries:
-                import time
                 time.sleep(retry_wait * (2 ** (attempt - 1)))
     raise RuntimeError(f"No available URL among: {urls}")
 
 
+def parse_state_tokens(value: str) -> List[str]:
+    stusps = []
+    for t in [t.strip() for t in value.split(',') if t.strip()]:
+        if len(t) == 2 and t.upper() in STATE_ABBR_TO_FIPS:
+            stusps.append(t.upper())
+        elif len(t) == 2 and t.isdigit():
+            # FIPS provided as 2-digit string
+            # map back to STUSPS if possible; otherwise keep FIPS for cousub url
+            found = [k for k, v in STATE_ABBR_TO_FIPS.items() if v == t]
+            stusps.append(found[0] if found else t)
+        else:
+            raise SystemExit(f"Unrecognized state token: {t}")
+    return stusps
+
+
 def parse_args():
     p = argparse.ArgumentParser(description="Prefetch TIGER/Cartographic boundary zips for caching")
     p.add_argument('--cache-dir', required=True, help='Directory to store downloaded TIGER zips')
     p.add_argument('--insecure', action='store_true', help='Disable TLS verification for downloads')
     p.add_argument('--states', help='Comma-separated STUSPS or FIPS; default ALL including territories')
+    p.add_argument('--workers', type=int, default=8, help='Concurrent downloads (default 8)')
     p.add_argument('--max-retries', type=int, default=6, help='Max HTTP retries per file (default 6)')
     p.add_argument('--retry-wait', type=float, default=2.0, help='Base seconds for exponential backoff (default 2.0)')
-    p.add_argument('--until-complete', action='store_true', help='Loop passes until all files are cached')
+    p.add_argument('--until-complete', action='store_true', help='Repeat passes over failed files until all are cached')
+    p.add_argument('--verify', action='store_true', help='Re-hash cached files against the manifest and refetch mismatches')
     p.add_argument('--no-cousub', action='store_true', help='Skip county subdivisions downloads')
     p.add_argument('--no-tracts', action='store_true', help='Skip census tracts downloads')
     p.add_argument('--bg-states', help='Comma-separated STUSPS or FIPS to download block groups for (e.g., FL,GA,SC)')
@@ -77,89 +239,76 @@ def parse_args():
 def main() -> int:
     args = parse_args()
     dest = args.cache_dir
+    os.makedirs(dest, exist_ok=True)
     insecure = args.insecure or bool(os.environ.get('CHOROPLETH_INSECURE'))
-    max_retries = args.max_retries
-    retry_wait = args.retry_wait
-
-    # Determine target states/territories
-    if args.states:
-        tokens = [t.strip() for t in args.states.split(',') if t.strip()]
-        stusps = []
-        for t in tokens:
-            if len(t) == 2 and t.upper() in STATE_ABBR_TO_FIPS:
-                stusps.append(t.upper())
-            elif len(t) == 2 and t.isdigit():
-                # FIPS provided as 2-digit string
-                # map back to STUSPS if possible; otherwise keep FIPS for cousub url
-                found = [k for k, v in STATE_ABBR_TO_FIPS.items() if v == t]
-                stusps.append(found[0] if found else t)
-            else:
-                raise SystemExit(f"Unrecognized state token: {t}")
-    else:
-        stusps = list(STATE_ABBR_TO_FIPS.keys())
+    workers = max(1, args.workers)
+    session = make_session(workers, insecure)
+    manifest = Manifest(dest)
 
-    # National layers
-    download(place_url(), dest, insecure=insecure, max_retries=max_retries, retry_wait=retry_wait)
-    zcta_url = resolve_first_available(zcta_urls(), insecure=insecure, max_retries=max_retries, retry_wait=retry_wait)
-    download(zcta_url, dest, insecure=insecure, max_retries=max_retries, retry_wait=retry_wait)
-    # States and counties national files
-    download(state_us_url(), dest, insecure=insecure, max_retries=max_retries, retry_wait=retry_wait)
-    download(county_us_url(), dest, insecure=insecure, max_retries=max_retries, retry_wait=retry_wait)
-
-    # Per-state county subdivisions (may 404 for some territories; skip those)
-    def pending_urls():
-        urls = []
-        for st in stusps:
-            fips = STATE_ABBR_TO_FIPS.get(st, st)
-            if not args.no_cousub:
-                url = cousub_url(fips)
-                if not os.path.exists(os.path.join(dest, os.path.basename(url))):
-                    urls.append((st, fips, url))
-            if not args.no_tracts:
-                # Per-state tracts (may 404 for some territories; handled below)
-                turl = tract_url(fips)
-                if not os.path.exists(os.path.join(dest, os.path.basename(turl))):
-                    urls.append((st, fips, turl))
-        return urls
-
-    # Initial pass
-    for st, fips, url in pending_urls():
-        try:
-            download(url, dest, insecure=insecure, max_retries=max_retries, retry_wait=retry_wait)
-        except Exception as e:
-            print(f"defer {st} ({fips}): {e}")
+    stusps = parse_state_tokens(args.states) if args.states else list(STATE_ABBR_TO_FIPS.keys())
 
+    # National layers
+    urls = [place_url(), state_us_url(), county_us_url()]
+    urls.append(resolve_first_available(session, zcta_urls(), max_retries=args.max_retries, retry_wait=args.retry_wait))
+    # Per-state county subdivisions and tracts (may 404 for some territories; skipped)
+    for st in stusps:
+        fips = STATE_ABBR_TO_FIPS.get(st, st)
+        if not args.no_cousub:
+            urls.append(cousub_url(fips))
+        if not args.no_tracts:
+            urls.append(tract_url(fips))
     # Optional: Block groups for selected states
     if args.bg_states:
-        tokens = [t.strip() for t in args.bg_states.split(',') if t.strip()]
-        for t in tokens:
-            st = t.upper()
-            fips = STATE_ABBR_TO_FIPS.get(st, st)
-            burl = bg_url(fips)
-            try:
-                download(burl, dest, insecure=insecure, max_retries=max_retries, retry_wait=retry_wait)
-            except Exception as e:
-                print(f"defer BG {st} ({fips}): {e}")
-
-    # Loop until complete if requested
-    if args.until_complete:
-        import time
-        round_num = 1
-        while True:
-            pend = pending_urls()
-            if not pend:
-                break
-            print(f"Round {round_num}: retrying {len(pend)} remaining files...")
-            for st, fips, url in pend:
+        for st in parse_state_tokens(args.bg_states):
+            urls.append(bg_url(STATE_ABBR_TO_FIPS.get(st, st)))
+    urls = list(dict.fromkeys(urls))
+
+    if args.verify:
+        for u in urls:
+            fn = os.path.basename(u)
+            if fn in manifest.entries and os.path.exists(os.path.join(dest, fn)) and not manifest.is_complete(fn, verify=True):
+                print(f"checksum mismatch, refetching: {fn}")
+                os.remove(os.path.join(dest, fn))
+
+    t0 = time.time()
+    total_bytes = 0
+    missing: List[str] = []
+    pending = urls
+    round_num = 1
+    while pending:
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(download, session, u, dest, manifest, args.max_retries, args.retry_wait): u
+                for u in pending
+            }
+            for fut in as_completed(futures):
+                u = futures[fut]
                 try:
-                    download(url, dest, insecure=insecure, max_retries=max_retries, retry_wait=retry_wait)
+                    total_bytes += fut.result()[1]
+                except NotFound:
+                    print(f"not published: {os.path.basename(u)}")
+                    missing.append(u)
                 except Exception as e:
-                    print(f"defer {st} ({fips}): {e}")
-            round_num += 1
-            time.sleep(retry_wait * 5)
+                    print(f"defer {os.path.basename(u)}: {e}")
+                    failed.append(u)
+        if not failed or not args.until_complete:
+            pending = failed
+            break
+        round_num += 1
+        print(f"Round {round_num}: retrying {len(failed)} remaining files...")
+        time.sleep(args.retry_wait * 5)
+        pending = failed
 
+    elapsed = time.time() - t0
+    rate = total_bytes / elapsed / 1e6 if elapsed > 0 else 0.0
+    print(f"Fetched {total_bytes / 1e6:.1f} MB in {elapsed:.1f}s ({rate:.1f} MB/s)")
+    if missing:
+        print(f"Not published ({len(missing)}): {', '.join(os.path.basename(u) for u in missing)}")
+    if pending:
+        print(f"Incomplete ({len(pending)}); rerun to resume: {', '.join(os.path.basename(u) for u in pending)}")
     print(f"Done. Cached files in {dest}")
-    return 0
+    return 1 if pending else 0
 
 
 if __name__ == '__main__':
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for finished response bodies (e.g. /join results).
+
+Bodies are kept in a memory LRU and written through to ``<root>/<key>.bin``,
+so an entry pushed out of memory (or lost on restart) is still a file read
+away. Both tiers evict least-recently-used entries beyond their byte budgets.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def content_key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, root: str, memory_bytes: int, disk_bytes: int):
+        self.root = root
+        self.memory_bytes = int(memory_bytes)
+        self.disk_bytes = int(disk_bytes)
+        self._memory: 'OrderedDict[str, Tuple[bytes, dict]]' = OrderedDict()
+        self._disk: Optional['OrderedDict[str, int]'] = None
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.disk_used = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f'{key}.bin')
+
+    def _scan(self) -> None:
+        self._disk = OrderedDict()
+        self.disk_used = 0
+        try:
+            names = [n for n in os.listdir(self.root) if n.endswith('.bin')]
+        except OSError:
+            return
+        for name in sorted(names, key=lambda n: os.path.getmtime(os.path.join(self.root, n))):
+            size = os.path.getsize(os.path.join(self.root, name))
+            self._disk[name[:-4]] = size
+            self.disk_used += size
+
+    def _remember(self, key: str, body: bytes, meta: dict) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old[0])
+        if len(body) > self.memory_bytes:
+            return
+        self._memory[key] = (body, meta)
+        self.bytes += len(body)
+        while self.bytes > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, dict]]:
+        """(body, meta) for ``key`` from memory, else from disk; None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+            if self._disk is None:
+                self._scan()
+            if key not in self._disk:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), 'rb') as f:
+                    header = json.loads(f.readline())
+                    body = f.read()
+                os.utime(self._path(key))
+            except (OSError, ValueError):
+                self.disk_used -= self._disk.pop(key)
+                self.misses += 1
+                return None
+            self._disk.move_to_end(key)
+            self._remember(key, body, header)
+            self.disk_hits += 1
+            return body, header
+
+    def put(self, key: str, body: bytes, meta: Optional[dict] = None) -> None:
+        meta = meta or {}
+        with self._lock:
+            self._remember(key, body, meta)
+            if self._disk is None:
+                self._scan()
+            if len(body) > self.disk_bytes:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            path = self._path(key)
+            tmp = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                # One JSON header line (meta), then the body
+                f.write(json.dumps(meta).encode('utf-8') + b'\n')
+                f.write(body)
+            os.replace(tmp, path)
+            size = os.path.getsize(path)
+            self.disk_used += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            while self.disk_used > self.disk_bytes and len(self._disk) > 1:
+                old, old_size = self._disk.popitem(last=False)
+                self.disk_used -= old_size
+                try:
+                    os.remove(self._path(old))
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._memory),
+                'bytes': self.bytes,
+                'budget_bytes': self.memory_bytes,
+                'disk_entries': len(self._disk or {}),
+                'disk_bytes': self.disk_used,
+                'disk_budget_bytes': self.disk_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Shared-arc topology for polygon layers.
+
+Rings are cut at junctions (points where the neighbouring vertices differ
+between the rings that visit them), and each resulting arc is stored once
+no matter how many polygons use it. Adjacent counties or ZCTAs therefore
+share one copy of their common border. Used by the TopoJSON writer and by
+the shared-edge simplification of boundary layers.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import shapely
+
+
+class Topology(NamedTuple):
+    # arcs[i] is an (n, 2) array; integer grid coordinates when quantized
+    arcs: List[np.ndarray]
+    # Per input geometry: None, or a list of polygons, each a list of rings,
+    # each ring a list of arc refs (~i means arc i reversed, as in TopoJSON)
+    geometries: List[Optional[List[List[List[int]]]]]
+    # (scale_x, scale_y, translate_x, translate_y) when quantized
+    transform: Optional[Tuple[float, float, float, float]]
+    bbox: Tuple[float, float, float, float]
+
+
+def _polygon_rings(geom) -> List[List[np.ndarray]]:
+    if geom is None or geom.is_empty:
+        return []
+    polys = geom.geoms if geom.geom_type == 'MultiPolygon' else [geom]
+    out = []
+    for poly in polys:
+        if poly.geom_type != 'Polygon' or poly.is_empty:
+            continue
+        rings = [poly.exterior] + list(poly.interiors)
+        # Drop the closing vertex; rings are handled as cycles
+        out.append([np.asarray(r.coords)[:-1, :2] for r in rings])
+    return out
+
+
+def _dedupe_cycle(ring: np.ndarray) -> np.ndarray:
+    # Remove consecutive repeats (including across the wrap-around) left by quantization
+    if len(ring) == 0:
+        return ring
+    keep = np.any(ring != np.roll(ring, 1, axis=0), axis=1)
+    if not keep.any():
+        return ring[:1]
+    return ring[keep]
+
+
+def build_topology(geoms, quantization: Optional[int] = None) -> Topology:
+    """Extract shared arcs from an iterable of Polygon/MultiPolygon geometries."""
+    geoms = list(geoms)
+    polys_per_geom = [_polygon_rings(g) for g in geoms]
+    all_coords = [r for polys in polys_per_geom for rings in polys for r in rings]
+    if all_coords:
+        stacked = np.concatenate(all_coords)
+        x0, y0 = stacked.min(axis=0)
+        x1, y1 = stacked.max(axis=0)
+    else:
+        x0 = y0 = x1 = y1 = 0.0
+    bbox = (float(x0), float(y0), float(x1), float(y1))
+
+    transform = None
+    if quantization:
+        kx = (quantization - 1) / (x1 - x0) if x1 > x0 else 1.0
+        ky = (quantization - 1) / (y1 - y0) if y1 > y0 else 1.0
+        transform = (float(1.0 / kx), float(1.0 / ky), float(x0), float(y0))
+
+    # Quantize, then flatten all rings into one point table with cyclic prev/next
+    ring_list: List[np.ndarray] = []
+    ring_owner: List[Tuple[int, int, int]] = []
+    for gi, polys in enumerate(polys_per_geom):
+        for pi, rings in enumerate(polys):
+            for ri, ring in enumerate(rings):
+                if transform is not None:
+                    ring = np.column_stack([
+                        np.round((ring[:, 0] - x0) * kx),
+                        np.round((ring[:, 1] - y0) * ky),
+                    ]).astype(np.int64)
+                ring = _dedupe_cycle(ring)
+                if len(ring) < 3:
+                    continue
+                ring_list.append(ring)
+                ring_owner.append((gi, pi, ri))
+
+    arcs: List[np.ndarray] = []
+    geometries: List[Optional[List[List[List[int]]]]] = [None] * len(geoms)
+    if not ring_list:
+        return Topology(arcs, geometries, transform, bbox)
+
+    points = np.concatenate(ring_list)
+    sizes = np.array([len(r) for r in ring_list])
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    local = np.arange(len(points)) - np.repeat(starts, sizes)
+    ring_sizes = np.repeat(sizes, sizes)
+    ring_starts = np.repeat(starts, sizes)
+    prev_idx = ring_starts + (local - 1) % ring_sizes
+    next_idx = ring_starts + (local + 1) % ring_sizes
+
+    _, pid = np.unique(points, axis=0, return_inverse=True)
+    pid = pid.ravel().astype(np.int64)
+    n_ids = int(pid.max()) + 1
+    a, b = pid[prev_idx], pid[next_idx]
+    pair = np.minimum(a, b) * n_ids + np.maximum(a, b)
+    # A point is a junction when rings visit it with different neighbour pairs
+    uniq = np.unique(np.column_stack([pid, pair]), axis=0)
+    junction = np.bincount(uniq[:, 0], minlength=n_ids) > 1
+
+    arc_index: Dict[tuple, int] = {}
+
+    def add_arc(ids: np.ndarray, coords: np.ndarray) -> int:
+        key = tuple(ids.tolist())
+        hit = arc_index.get(key)
+        if hit is not None:
+            return hit
+        hit = arc_index.get(key[::-1])
+        if hit is not None:
+            return ~hit
+        arc_index[key] = len(arcs)
+        arcs.append(coords)
+        return len(arcs) - 1
+
+    for ring, (gi, pi, ri), start in zip(ring_list, ring_owner, starts):
+        ids = pid[start:start + len(ring)]
+        cuts = np.flatnonzero(junction[ids])
+        refs: List[int] = []
+        if len(cuts) == 0:
+            # Closed arc: rotate to a canonical start so a ring shared by two
+            # polygons (enclave/hole) is recognised as the same arc
+            k = int(np.argmin(ids))
+            ids_r = np.concatenate([ids[k:], ids[:k], ids[k:k + 1]])
+            ring_r = np.concatenate([ring[k:], ring[:k], ring[k:k + 1]])
+            refs.append(add_arc(ids_r, ring_r))
+        else:
+            k = int(cuts[0])
+            ids_r = np.concatenate([ids[k:], ids[:k], ids[k:k + 1]])
+            ring_r = np.concatenate([ring[k:], ring[:k], ring[k:k + 1]])
+            cut_pos = np.append(cuts - k, len(ids))
+            for s, e in zip(cut_pos[:-1], cut_pos[1:]):
+                refs.append(add_arc(ids_r[s:e + 1], ring_r[s:e + 1]))
+        polys = geometries[gi]
+        if polys is None:
+            polys = geometries[gi] = []
+        while len(polys) <= pi:
+            polys.append([])
+        if ri > 0 and not polys[pi]:
+            # Exterior collapsed under quantization; drop its holes too
+            continue
+        polys[pi].append(refs)
+
+    for gi, polys in enumerate(geometries):
+        if polys is not None:
+            polys = [p for p in polys if p]
+            geometries[gi] = polys or None
+    return Topology(arcs, geometries, transform, bbox)
+
+
+def _ring_coords(arcs: List[np.ndarray], refs: List[int]) -> np.ndarray:
+    parts = []
+    for ref in refs:
+        arc = arcs[~ref][::-1] if ref < 0 else arcs[ref]
+        # Consecutive arcs share their junction vertex
+        parts.append(arc if not parts else arc[1:])
+    return np.concatenate(parts)
+
+
+def _rebuild(arcs: List[np.ndarray], polys: List[List[List[int]]]):
+    parts = []
+    for rings in polys:
+        coords = [_ring_coords(arcs, refs) for refs in rings]
+        if len(coords[0]) < 4:
+            # Exterior collapsed to a line
+            continue
+        parts.append(shapely.Polygon(coords[0], [c for c in coords[1:] if len(c) >= 4]))
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else shapely.MultiPolygon(parts)
+
+
+def simplify_shared(geoms, tolerance: float, topo: Optional[Topology] = None, max_rounds: int = 3) -> np.ndarray:
+    """
+    Simplify polygons along shared arcs so neighbours stay gap-free.
+
+    Each arc is simplified once (Douglas-Peucker, end points fixed at the
+    junctions), so both sides of a border get the same vertices. Arcs of
+    polygons that come out invalid are put back at full detail, for both
+    neighbours; anything still invalid or collapsed after ``max_rounds``
+    falls back to per-polygon simplification. Pass ``topo`` (an unquantized
+    build_topology of the same geometries) to reuse it across tolerances.
+    """
+    geoms = np.asarray(list(geoms), dtype=object)
+    if topo is None:
+        topo = build_topology(geoms)
+    if not topo.arcs:
+        return geoms
+    sizes = [len(a) for a in topo.arcs]
+    lines = shapely.linestrings(np.concatenate(topo.arcs), indices=np.repeat(np.arange(len(sizes)), sizes))
+    arcs = [shapely.get_coordinates(g) for g in shapely.simplify(lines, tolerance, preserve_topology=False)]
+
+    owners: List[List[int]] = [[] for _ in arcs]
+    for gi, polys in enumerate(topo.geometries):
+        for rings in polys or []:
+            for refs in rings:
+                for ref in refs:
+                    owners[~ref if ref < 0 else ref].append(gi)
+
+    out = geoms.copy()
+    todo = [gi for gi, polys in enumerate(topo.geometries) if polys is not None]
+    restored = np.zeros(len(arcs), dtype=bool)
+    for _ in range(max_rounds):
+        for gi in todo:
+            out[gi] = _rebuild(arcs, topo.geometries[gi])
+        bad = [gi for gi in todo if out[gi] is None or not out[gi].is_valid]
+        if not bad:
+            break
+        reset = {
+            abs_ref for gi in bad for rings in topo.geometries[gi] for refs in rings
+            for abs_ref in (~r if r < 0 else r for r in refs) if not restored[abs_ref]
+        }
+        if not reset:
+            break
+        for ai in reset:
+            arcs[ai] = topo.arcs[ai]
+            restored[ai] = True
+        todo = sorted({gi for ai in reset for gi in owners[ai]})
+
+    bad = np.flatnonzero(shapely.is_missing(out) | ~shapely.is_valid(out))
+    if len(bad):
+        out[bad] = shapely.simplify(geoms[bad], tolerance, preserve_topology=True)
+    return out
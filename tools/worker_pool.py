@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Bounded executor for the blocking geopandas work behind the local engine.
+
+Endpoints await ``WorkerPool.run(fn, ...)`` instead of calling ``fn`` on the
+event loop, so a large join no longer stalls /health or other clients. At
+most ``max_concurrent`` jobs run at once; further requests wait in line (up
+to ``max_queue``, after which ``PoolBusy`` is raised).
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+MODES = ('thread', 'process')
+
+
+class PoolBusy(RuntimeError):
+    pass
+
+
+def _noop() -> None:
+    pass
+
+
+class WorkerPool:
+    def __init__(self, mode: str = 'thread', workers: int = 4, max_concurrent: Optional[int] = None,
+                 max_queue: int = 0, initializer: Optional[Callable[[], None]] = None):
+        if mode not in MODES:
+            raise ValueError(f"worker mode must be one of {', '.join(MODES)}, not {mode!r}")
+        self.mode = mode
+        self.workers = max(1, int(workers))
+        self.max_concurrent = max(1, int(max_concurrent or self.workers))
+        self.max_queue = max(0, int(max_queue))
+        self._initializer = initializer
+        self._initargs: tuple = ()
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.mode == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self._initializer,
+                                                         initargs=self._initargs)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='engine-worker')
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self.max_queue and self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise PoolBusy(f'{self.queued} requests already waiting')
+        self.queued += 1
+        t0 = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        t1 = time.perf_counter()
+        self.wait_seconds += t1 - t0
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self.run_seconds += time.perf_counter() - t1
+            self._semaphore.release()
+        return result
+
+    def prestart(self, initargs: tuple = ()) -> None:
+        """Start every worker process now; each runs the initializer with ``initargs`` once."""
+        with self._lock:
+            if self._executor is None:
+                self._initargs = initargs
+        executor = self._get_executor()
+        # Enough work to make the executor launch all of its processes
+        for _ in range(self.workers):
+            executor.submit(_noop)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        done = self.completed or 1
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'active': self.active,
+            'queued': self.queued,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'avg_wait_ms': round(self.wait_seconds / done * 1000, 1),
+            'avg_run_ms': round(self.run_seconds / done * 1000, 1),
+        }
+
+
+class Coalescer:
+    """
+    Share one in-flight job between identical concurrent requests.
+
+    Followers await the leader's task instead of queueing their own, so a
+    burst of identical requests costs one pool slot. The shared task is
+    shielded: a client that disconnects does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, make: Callable[[], Any]) -> Any:
+        fut = self._inflight.get(key)
+        if fut is None:
+            self.calls += 1
+            fut = asyncio.ensure_future(make())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f: self._done(key, f))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(fut)
+
+    def _done(self, key: Hashable, fut: asyncio.Future) -> None:
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        if not fut.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            fut.exception()
+
+    def stats(self) -> dict:
+        return {'in_flight': len(self._inflight), 'calls': self.calls, 'coalesced': self.coalesced}
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+ZCTA -> state/region assignment, computed once offline.
+
+ZCTAs do not carry a state code, so state and region requests used to test
+every ZCTA centroid against the state polygons on each call. The converter
+stores the result as a small sidecar table instead; readers filter it with
+a plain equality lookup.
+"""
+
+import os
+from typing import Optional
+
+import pandas as pd
+
+INDEX_NAME = "zcta_state_index.parquet"
+
+REGIONS = {
+    'NORTHEAST': ['CT', 'MA', 'ME', 'NH', 'NJ', 'NY', 'PA', 'RI', 'VT'],
+    'MIDWEST': ['IL', 'IN', 'IA', 'KS', 'MI', 'MN', 'MO', 'NE', 'ND', 'OH', 'SD', 'WI'],
+    'SOUTH': ['AL', 'AR', 'DE', 'FL', 'GA', 'KY', 'LA', 'MD', 'MS', 'NC', 'OK', 'SC', 'TN', 'TX', 'VA', 'WV', 'DC'],
+    'WEST': ['AZ', 'CA', 'CO', 'ID', 'MT', 'NV', 'NM', 'OR', 'UT', 'WA', 'WY', 'AK', 'HI']
+}
+
+STATE_TO_REGION = {st: region for region, states in REGIONS.items() for st in states}
+
+
+def zcta_key_column(columns) -> Optional[str]:
+    for c in ('GEOID20', 'GEOID10', 'ZCTA5CE20', 'ZCTA5CE10'):
+        if c in columns:
+            return c
+    return None
+
+
+def build_zcta_state_index(zctas, states) -> pd.DataFrame:
+    """One row per ZCTA: ZCTA5, STATEFP, STUSPS, REGION (state containing the centroid)."""
+    import geopandas as gpd
+
+    key = zcta_key_column(zctas.columns)
+    if key is None:
+        raise ValueError("Unexpected ZCTA schema: missing GEOID/ZCTA5CE fields")
+    pts = gpd.GeoDataFrame(geometry=zctas.geometry.centroid, crs=zctas.crs)
+    hit = gpd.sjoin(pts, states[['STATEFP', 'STUSPS', 'geometry']].to_crs(zctas.crs), how='left', predicate='within')
+    hit = hit[~hit.index.duplicated(keep='first')].reindex(zctas.index)
+    index = pd.DataFrame({
+        'ZCTA5': zctas[key].astype(str).str.zfill(5).to_numpy(),
+        'STATEFP': hit['STATEFP'].to_numpy(),
+        'STUSPS': hit['STUSPS'].to_numpy(),
+    })
+    index['REGION'] = index['STUSPS'].map(STATE_TO_REGION)
+    # ZCTAs whose centroid falls in no state (offshore slivers) are never selected
+    return index[index['STATEFP'].notna()].reset_index(drop=True)
+
+
+def index_path(parquet_dir: str) -> str:
+    return os.path.join(parquet_dir, INDEX_NAME)
+
+
+def read_zcta_state_index(parquet_dir: str) -> Optional[pd.DataFrame]:
+    path = index_path(parquet_dir)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def zctas_for_state(index: pd.DataFrame, state_abbr: str) -> pd.Series:
+    if state_abbr in REGIONS:
+        return index.loc[index['REGION'] == state_abbr, 'ZCTA5']
+    return index.loc[index['STUSPS'] == state_abbr, 'ZCTA5']